@@ -0,0 +1,28 @@
+import argparse
+
+from backend.app import app, db, init_db, archive_cold_data, enable_incremental_vacuum
+
+def archive(enable_vacuum=False):
+    with app.app_context():
+        try:
+            init_db()
+            if enable_vacuum:
+                print("Enabling incremental VACUUM (one-time full VACUUM, the database is locked meanwhile)...")
+                for bind_key in (None, 'archive'):
+                    if enable_incremental_vacuum(bind_key):
+                        print(f"Enabled on {bind_key or 'main'} database.")
+            print("Archiving cold messages and notifications...")
+            stats = archive_cold_data()
+            print(f"Archived {stats['messages']} messages and {stats['notifications']} notifications.")
+            print(f"Removed {stats['orphans']} orphaned rows, freed {stats['freedPages']} pages.")
+            print("\n✅ Archival complete!")
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Error archiving data: {e}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move cold messages and notifications to the archive database")
+    parser.add_argument('--enable-incremental-vacuum', action='store_true',
+                        help="switch both databases to auto_vacuum=INCREMENTAL first")
+    args = parser.parse_args()
+    archive(enable_vacuum=args.enable_incremental_vacuum)
@@ -1,10 +1,39 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.types import TypeDecorator
 import uuid
 import os
+import re
+import io
+import csv
 import json
-from datetime import datetime
+import zlib
+import hmac
+import time
+import hashlib
+import functools
+import threading
+import gzip
+import sqlite3
+from contextlib import closing
+from types import SimpleNamespace
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import numpy as np
+
+try:
+    import brotli  # Optional: enables Content-Encoding: br
+except ImportError:
+    brotli = None
+
+try:
+    from .gazetteer import Gazetteer, REGIONS, ONLINE_REGION_ID
+    from .ranking import JobRanker, DEFAULT_RANKING_WEIGHTS, parse_posted_at
+except ImportError:  # Run as a script: python backend/app.py
+    from gazetteer import Gazetteer, REGIONS, ONLINE_REGION_ID
+    from ranking import JobRanker, DEFAULT_RANKING_WEIGHTS, parse_posted_at
 
 app = Flask(__name__)
 CORS(app)
@@ -13,12 +42,50 @@ CORS(app)
 # Database file will be created in an 'instance' folder in the current directory
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///shakthi_v6.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Cold messages and notifications are moved here by the archiver
+app.config['SQLALCHEMY_BINDS'] = {'archive': 'sqlite:///shakthi_archive.db'}
+# Admin-only endpoints (data exports) are disabled unless a token is configured
+app.config['ADMIN_TOKEN'] = os.environ.get('SHAKTHI_ADMIN_TOKEN')
 
 db = SQLAlchemy(app)
 
+# Compact Keys
+# IDs are UUID strings everywhere in Python and the API, but key columns store
+# them as 16-byte blobs instead of 36 characters, which shrinks every key,
+# foreign key and index built on them. Values that are not canonical lowercase
+# UUIDs (demo IDs such as 'customer_1') are stored as text, unchanged.
+# Databases written before this are converted once by compact_keys().
+KEY_FORMAT_VERSION = 1 # Stored in PRAGMA user_version once keys are compact
+
+def uuid_to_key(value):
+    if isinstance(value, str) and len(value) == 36:
+        try:
+            parsed = uuid.UUID(value)
+        except ValueError:
+            return value
+        if str(parsed) == value:
+            return parsed.bytes
+    return value
+
+def key_to_uuid(value):
+    if isinstance(value, bytes) and len(value) == 16:
+        return str(uuid.UUID(bytes=value))
+    return value
+
+class UUIDKey(TypeDecorator):
+    """String UUID in Python, 16-byte blob in SQLite"""
+    impl = db.String(36)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return uuid_to_key(value)
+
+    def process_result_value(self, value, dialect):
+        return key_to_uuid(value)
+
 # Models
 class User(db.Model):
-    id = db.Column(db.String(36), primary_key=True)
+    id = db.Column(UUIDKey, primary_key=True)
     name = db.Column(db.String(100))
     email = db.Column(db.String(100), unique=True)
     phone = db.Column(db.String(20))
@@ -26,28 +93,19 @@ class User(db.Model):
     aadhaarLast4 = db.Column(db.String(4))
     gender = db.Column(db.String(10))
     credits = db.Column(db.Integer, default=0)
-    rating = db.Column(db.Float, default=0.0)
-    reviewCount = db.Column(db.Integer, default=0)
+    rating = db.Column(db.Float, default=0.0, index=True)
+    reviewCount = db.Column(db.Integer, default=0, index=True)
     isVerified = db.Column(db.Boolean, default=True)
-    availability = db.Column(db.String(100))
+    availability = db.Column(db.String(100), index=True)
     skills_str = db.Column(db.String(500), default="[]")
     last_seen = db.Column(db.DateTime, nullable=True)
+    region_id = db.Column(db.Integer, nullable=True, index=True) # Gazetteer region resolved from address
 
     def to_dict(self):
-        skills = []
-        try:
-            if self.skills_str:
-                s = self.skills_str.replace("'", '"')
-                if "[" in s:
-                    skills = json.loads(s)
-        except:
-             skills = []
+        skills = parse_skills(self.skills_str)
 
         # Check if online (active in last 2 minutes)
-        is_online = False
-        if self.last_seen:
-            time_diff = (datetime.now() - self.last_seen).total_seconds()
-            is_online = time_diff < 120  # 2 minutes
+        is_online = PresenceTracker.is_online(self.last_seen)
 
         return {
             'id': self.id,
@@ -63,14 +121,14 @@ class User(db.Model):
             'isVerified': self.isVerified,
             'availability': self.availability,
             'skills': skills,
-            'workHistory': [],
+            'workHistory': [entry.to_dict() for entry in recent_work_history(self.id)],
             'radius': 5,
             'isOnline': is_online,
             'lastSeen': self.last_seen.isoformat() if self.last_seen else None
         }
 
 class Job(db.Model):
-    id = db.Column(db.String(36), primary_key=True)
+    id = db.Column(UUIDKey, primary_key=True)
     title = db.Column(db.String(100))
     description = db.Column(db.String(500))
     category = db.Column(db.String(50))
@@ -84,9 +142,16 @@ class Job(db.Model):
     postedAt = db.Column(db.String(50))
     status = db.Column(db.String(20), default='open') 
     paymentMode = db.Column(db.String(50), default='online') # online (escrow) or cod
-    worker_id = db.Column(db.String(36), db.ForeignKey('user.id'), nullable=True)
+    worker_id = db.Column(UUIDKey, db.ForeignKey('user.id'), nullable=True)
     # Store the creator's ID (mocking it mostly to '1' for demo if not provided)
-    creator_id = db.Column(db.String(36), nullable=True) 
+    creator_id = db.Column(UUIDKey, nullable=True, index=True)
+    region_id = db.Column(db.Integer, nullable=True, index=True) # Gazetteer region resolved from location
+    created_at = db.Column(db.DateTime, default=datetime.now, index=True) # Sortable twin of postedAt
+    escrow_held = db.Column(db.Integer, default=0) # Snapshot of the job's escrow in the credits ledger
+    change_seq = db.Column(db.Integer, nullable=True, index=True) # Set by the delta sync triggers
+    partition_id = db.Column(db.Integer, nullable=True) # Region partition, fixed when posted
+
+    __table_args__ = (db.Index('ix_job_partition_status_created', 'partition_id', 'status', 'created_at'),)
 
     def to_dict(self):
         return {
@@ -103,15 +168,20 @@ class Job(db.Model):
             'customerRating': self.customerRating,
             'postedAt': self.postedAt,
             'status': self.status,
-            'creator_id': self.creator_id
+            'creator_id': self.creator_id,
+            'escrowHeld': self.escrow_held or 0
         }
 
 class JobApplication(db.Model):
-    id = db.Column(db.String(36), primary_key=True)
-    job_id = db.Column(db.String(36), db.ForeignKey('job.id'), nullable=False)
-    worker_id = db.Column(db.String(36), db.ForeignKey('user.id'), nullable=False)
+    id = db.Column(UUIDKey, primary_key=True)
+    job_id = db.Column(UUIDKey, db.ForeignKey('job.id'), nullable=False, index=True)
+    worker_id = db.Column(UUIDKey, db.ForeignKey('user.id'), nullable=False, index=True)
     status = db.Column(db.String(20), default='pending') # pending, accepted, rejected
     timestamp = db.Column(db.String(50))
+    change_seq = db.Column(db.Integer, nullable=True, index=True) # Set by the delta sync triggers
+    partition_id = db.Column(db.Integer, nullable=True) # Same as the job's
+
+    __table_args__ = (db.Index('ix_job_application_partition_status', 'partition_id', 'status', 'timestamp'),)
 
     worker = db.relationship('User', backref='applications')
     job = db.relationship('Job', backref='applications')
@@ -130,12 +200,16 @@ class JobApplication(db.Model):
 
 
 class Message(db.Model):
-    id = db.Column(db.String(36), primary_key=True)
-    job_id = db.Column(db.String(36), db.ForeignKey('job.id'), nullable=False)
-    sender_id = db.Column(db.String(36), db.ForeignKey('user.id'), nullable=False)
+    id = db.Column(UUIDKey, primary_key=True)
+    job_id = db.Column(UUIDKey, db.ForeignKey('job.id'), nullable=False)
+    sender_id = db.Column(UUIDKey, db.ForeignKey('user.id'), nullable=False)
     content = db.Column(db.String(1000), nullable=True)
     timestamp = db.Column(db.String(50))
     read = db.Column(db.Boolean, default=False)
+    change_seq = db.Column(db.Integer, nullable=True, index=True) # Set by the delta sync triggers
+    partition_id = db.Column(db.Integer, nullable=True) # Same as the job's
+
+    __table_args__ = (db.Index('ix_message_partition_job', 'partition_id', 'job_id'),)
 
     def to_dict(self):
         return {
@@ -147,10 +221,315 @@ class Message(db.Model):
             'read': self.read
         }
 
+def parse_skills(skills_str):
+    """Parse the stored skills list, tolerating legacy single-quoted values"""
+    try:
+        if skills_str:
+            s = skills_str.replace("'", '"')
+            if "[" in s:
+                return json.loads(s)
+    except:
+        pass
+    return []
+
+# Upper bound on items in one bulk/batch request
+BULK_MAX_ITEMS = 1000
+
+# Job State Machine
+# Lifecycle: open -> on_hold -> locked -> completed (on_hold -> open on reject/cancel,
+# open -> expired when the sweeper finds it stale).
+# Each transition is a conditional UPDATE ... WHERE status IN (expected), so the
+# status check and the write happen in one statement. When two requests race on
+# the same job only one UPDATE matches a row; the loser sees rowcount 0.
+JOB_TRANSITIONS = {
+    'apply': (('open',), 'on_hold'),
+    'accept': (('on_hold', 'hold'), 'locked'),
+    'release': (('on_hold', 'hold'), 'open'),
+    'complete': (('locked', 'accepted'), 'completed'),
+    'expire': (('open',), 'expired'),
+}
+# Statuses in which a job stays in users' recommendation feeds
+FEED_JOB_STATUSES = ('open', 'on_hold')
+
+def transition_job(job_id, action, **values):
+    """
+    Atomically move a job to the next lifecycle state.
+    Returns True if this caller made the transition, False if the job was
+    not in one of the expected states (e.g. another request won the race).
+    """
+    from_statuses, to_status = JOB_TRANSITIONS[action]
+    result = db.session.execute(
+        db.update(Job)
+        .where(Job.id == job_id, Job.status.in_(from_statuses))
+        .values(status=to_status, **values)
+        .execution_options(synchronize_session='fetch')
+    )
+    if result.rowcount != 1:
+        return False
+    job = db.session.get(Job, job_id)
+    mark_dashboard_stale(job.creator_id, job.worker_id)
+    if to_status not in FEED_JOB_STATUSES:
+        UserJobFeed.query.filter_by(job_id=job_id).delete(synchronize_session=False)
+    return True
+
+def transition_application(app_id, from_status, to_status):
+    """Atomically move an application from from_status to to_status"""
+    result = db.session.execute(
+        db.update(JobApplication)
+        .where(JobApplication.id == app_id, JobApplication.status == from_status)
+        .values(status=to_status)
+        .execution_options(synchronize_session='fetch')
+    )
+    if result.rowcount != 1:
+        return False
+    application = db.session.get(JobApplication, app_id)
+    mark_dashboard_stale(application.worker_id, application.job.creator_id)
+    return True
+
+# Dashboard Cache
+# /api/dashboard results are cached per user for a few seconds. Writes that
+# change a user's counts mark that user stale (ORM objects are picked up in
+# after_flush, bulk UPDATE/DELETE statements call mark_dashboard_stale) and
+# the cached entries are dropped once the transaction commits.
+DASHBOARD_CACHE_SECONDS = 5
+
+class DashboardCache:
+    """Short-lived per-user cache of dashboard aggregates"""
+
+    def __init__(self, ttl_seconds):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries = {}  # user_id -> (expires, value)
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry[0] > time.monotonic():
+                return entry[1]
+            self._entries.pop(user_id, None)
+            return None
+
+    def set(self, user_id, value):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl_seconds, value)
+
+    def invalidate(self, user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+dashboard_cache = DashboardCache(DASHBOARD_CACHE_SECONDS)
+
+def mark_dashboard_stale(*user_ids):
+    """Invalidate these users' dashboards when the current transaction commits"""
+    db.session.info.setdefault('stale_dashboards', set()).update(u for u in user_ids if u)
+
+@db.event.listens_for(db.session, 'after_flush')
+def collect_stale_dashboards(session, flush_context):
+    stale = session.info.setdefault('stale_dashboards', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User):
+            stale.add(obj.id)
+        elif isinstance(obj, Notification):
+            stale.add(obj.user_id)
+        elif isinstance(obj, Job):
+            stale.update((obj.creator_id, obj.worker_id))
+        elif isinstance(obj, JobApplication):
+            stale.add(obj.worker_id)
+    stale.discard(None)
+
+@db.event.listens_for(db.session, 'after_commit')
+def invalidate_stale_dashboards(session):
+    stale = session.info.pop('stale_dashboards', None)
+    if stale:
+        dashboard_cache.invalidate(stale)
+
+@db.event.listens_for(db.session, 'after_rollback')
+def discard_stale_dashboards(session):
+    session.info.pop('stale_dashboards', None)
+
+# Idempotency Keys
+# Mobile clients on flaky connections retry POSTs. When a request carries an
+# Idempotency-Key header the first response is remembered and replayed for
+# retries, and a retry that arrives while the original is still running waits
+# for it instead of executing twice.
+app.config.setdefault('IDEMPOTENCY_TTL_SECONDS', 24 * 3600)
+app.config.setdefault('IDEMPOTENCY_MAX_KEYS', 10000)
+app.config.setdefault('IDEMPOTENCY_WAIT_SECONDS', 30)
+
+class IdempotencyStore:
+    """Bounded, expiring in-memory record of responses keyed by Idempotency-Key"""
+
+    def __init__(self, max_keys, ttl_seconds):
+        self.max_keys = max_keys
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> entry, least recently used first
+
+    def begin(self, key, fingerprint):
+        """
+        Look up or claim a key.
+        Returns (entry, is_owner); the owner must call finish() when done.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry['expires'] < now:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry, False
+            
+            entry = {
+                'fingerprint': fingerprint,
+                'response': None,
+                'done': threading.Event(),
+                'expires': now + self.ttl_seconds,
+            }
+            self._entries[key] = entry
+            # Evict least recently used keys; waiters keep their own reference
+            while len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+            return entry, True
+
+    def replayable(self, key, fingerprint):
+        """Whether a request with this key and body will be answered with a stored response"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return (entry is not None and entry['expires'] >= time.monotonic()
+                    and entry['fingerprint'] == fingerprint and entry['response'] is not None)
+
+    def finish(self, key, entry, response):
+        """Store the response for replay, or release the key if response is None"""
+        with self._lock:
+            if response is None and self._entries.get(key) is entry:
+                del self._entries[key]
+            entry['response'] = response
+        entry['done'].set()
+
+idempotency_store = IdempotencyStore(app.config['IDEMPOTENCY_MAX_KEYS'], app.config['IDEMPOTENCY_TTL_SECONDS'])
+
+def idempotency_key():
+    """(scoped key, body fingerprint) of the current request, or None without an Idempotency-Key"""
+    key = request.headers.get('Idempotency-Key')
+    if not key:
+        return None
+    return f"{request.method} {request.path} {key}", hashlib.sha256(request.get_data()).hexdigest()
+
+def replay_response(stored):
+    status, body, content_type = stored
+    response = app.response_class(body, status=status, content_type=content_type)
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+def idempotent(view):
+    """Make a POST endpoint safe to retry with an Idempotency-Key header"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        idempotency = idempotency_key()
+        if not idempotency:
+            return view(*args, **kwargs)
+        
+        scoped_key, fingerprint = idempotency
+        while True:
+            entry, is_owner = idempotency_store.begin(scoped_key, fingerprint)
+            if is_owner:
+                break
+            if entry['fingerprint'] != fingerprint:
+                return jsonify({'success': False, 'message': 'Idempotency-Key was already used for a different request'}), 422
+            # Same request still running elsewhere: wait for its result
+            if not entry['done'].wait(app.config['IDEMPOTENCY_WAIT_SECONDS']):
+                return jsonify({'success': False, 'message': 'Original request is still in progress'}), 409
+            if entry['response'] is not None:
+                return replay_response(entry['response'])
+            # The original failed with a server error, so this retry runs it again
+        
+        stored = None
+        try:
+            response = app.make_response(view(*args, **kwargs))
+            # Server errors are not remembered so the client can retry them
+            if response.status_code < 500:
+                stored = (response.status_code, response.get_data(), response.content_type)
+            return response
+        finally:
+            idempotency_store.finish(scoped_key, entry, stored)
+    return wrapper
+
+# Presence
+# last_seen is mirrored in memory so presence checks for many users are a dict
+# lookup, and the user row is only rewritten every PRESENCE_WRITE_INTERVAL_SECONDS.
+ONLINE_WINDOW_SECONDS = 120  # Online means active in the last 2 minutes
+PRESENCE_WRITE_INTERVAL_SECONDS = 30
+PRESENCE_POLL_SECONDS = 10
+MAX_PRESENCE_USERS = 500
+
+class PresenceTracker:
+    """In-memory map of user_id -> last_seen with change notification"""
+
+    def __init__(self):
+        self._changed = threading.Condition()
+        self._last_seen = {}
+        self._last_written = {}
+
+    @staticmethod
+    def is_online(last_seen, now=None):
+        if last_seen is None:
+            return False
+        return ((now or datetime.now()) - last_seen).total_seconds() < ONLINE_WINDOW_SECONDS
+
+    def touch(self, user_id, now):
+        """
+        Record activity for a user.
+        Returns True if the database copy of last_seen is stale and should be written
+        """
+        with self._changed:
+            was_online = self.is_online(self._last_seen.get(user_id), now)
+            self._last_seen[user_id] = now
+            if not was_online:
+                self._changed.notify_all()  # Wake subscribers: this user just came online
+            last_written = self._last_written.get(user_id)
+            if last_written is None or (now - last_written).total_seconds() >= PRESENCE_WRITE_INTERVAL_SECONDS:
+                self._last_written[user_id] = now
+                return True
+            return False
+
+    def lookup(self, user_ids):
+        """{user_id: last_seen}, loading users not yet in memory with one query"""
+        with self._changed:
+            missing = [u for u in user_ids if u not in self._last_seen]
+        if missing:
+            found = dict(db.session.query(User.id, User.last_seen).filter(User.id.in_(missing)).all())
+            with self._changed:
+                for user_id, last_seen in found.items():
+                    self._last_seen.setdefault(user_id, last_seen)
+        return self.snapshot(user_ids)
+
+    def snapshot(self, user_ids):
+        """{user_id: last_seen} from memory only"""
+        with self._changed:
+            return {u: self._last_seen.get(u) for u in user_ids}
+
+    def wait(self, timeout):
+        """Block until someone comes online or timeout passes (offline is time-based)"""
+        with self._changed:
+            self._changed.wait(timeout)
+
+presence = PresenceTracker()
+
+def presence_user_ids(values):
+    """De-duplicated, bounded list of user IDs from a request"""
+    return list(dict.fromkeys(u for u in values if u))[:MAX_PRESENCE_USERS]
+
 @app.before_request
 def update_last_seen():
     """Update user's last_seen timestamp on every request"""
     try:
+        # A retry answered from the idempotency store does not touch the database
+        idempotency = idempotency_key()
+        if idempotency and idempotency_store.replayable(*idempotency):
+            return
+        
         user_id = None
         if request.is_json and request.json:
             user_id = request.json.get('senderId') or request.json.get('userId') or request.json.get('workerId')
@@ -159,23 +538,85 @@ def update_last_seen():
             user_id = request.args.get('userId')
 
         if user_id:
-            user = User.query.get(user_id)
-            if user:
-                user.last_seen = datetime.now()
-                db.session.commit()
+            now = datetime.now()
+            # Only hit the user table when the stored last_seen is getting stale
+            if presence.touch(user_id, now):
+                user = User.query.get(user_id)
+                if user:
+                    user.last_seen = now
+                    db.session.commit()
     except:
         pass  # Don't block requests
 
+# Response Compression
+# JSON and text responses are gzip- or brotli-compressed when the client's
+# Accept-Encoding allows it (brotli only if the brotli package is installed).
+# Streamed responses (SSE, exports) are left alone.
+app.config.setdefault('COMPRESS_MIN_SIZE', 500)
+app.config.setdefault('COMPRESS_LEVEL', 6)
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/html', 'text/plain', 'text/csv')
+
+def choose_encoding(accept_encodings):
+    """Best supported encoding the client accepts, or None"""
+    candidates = (['br'] if brotli else []) + ['gzip']
+    best = max(candidates, key=lambda enc: accept_encodings.quality(enc))
+    return best if accept_encodings.quality(best) > 0 else None
+
+def compress_body(body, encoding):
+    if encoding == 'br':
+        # Brotli quality 0-11; map the shared 1-9 level onto it
+        return brotli.compress(body, quality=min(11, app.config['COMPRESS_LEVEL'] + 2))
+    return gzip.compress(body, compresslevel=app.config['COMPRESS_LEVEL'])
+
+@app.after_request
+def compress_response(response):
+    if (response.direct_passthrough or response.is_streamed
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or 'Content-Encoding' in response.headers):
+        return response
+    response.vary.add('Accept-Encoding')
+    if response.status_code < 200 or response.status_code in (204, 304):
+        return response
+    body = response.get_data()
+    if len(body) < app.config['COMPRESS_MIN_SIZE']:
+        return response
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding:
+        response.set_data(compress_body(body, encoding))
+        response.headers['Content-Encoding'] = encoding
+    return response
+
 @app.route('/api/messages/<job_id>', methods=['GET'])
 def get_messages(job_id):
-    messages = Message.query.filter_by(job_id=job_id).order_by(Message.timestamp.asc()).all()
-    return jsonify([msg.to_dict() for msg in messages])
+    try:
+        fields = requested_fields(MESSAGE_FIELDS, extra=('archived',))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    query = Message.query.filter_by(job_id=job_id).order_by(Message.timestamp.asc())
+    if fields:
+        result = select_fields(query, MESSAGE_FIELDS, fields)
+    else:
+        result = [msg.to_dict() for msg in query]
+    # Conversations of finished jobs may have been archived; those are older
+    # than anything still live, so they go first
+    include_archived = request.args.get('includeArchived')
+    if include_archived is None:
+        job = Job.query.get(job_id)
+        include_archived = not job or job.status in ARCHIVABLE_JOB_STATUSES
+    else:
+        include_archived = include_archived in ('1', 'true')
+    if include_archived:
+        archived = ArchivedMessage.query.filter_by(job_id=job_id).order_by(db.text('archived_message.rowid')).all()
+        result = [trim_fields(msg.to_dict(), fields) for msg in archived] + result
+    return jsonify(result)
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
     return jsonify({'status': 'ok'})
 
 @app.route('/api/messages', methods=['POST'])
+@idempotent
 def send_message():
     data = request.json
     print(f"Message attempt: {data}")
@@ -258,6 +699,54 @@ def get_user_status(user_id):
         return jsonify({'success': False}), 404
     return jsonify({'success': True, 'user': user.to_dict()})
 
+@app.route('/api/presence', methods=['POST'])
+def get_presence():
+    """
+    Online status for many users at once
+    Body: {"userIds": [...]} -> {"presence": [[userId, isOnline, lastSeen], ...]}
+    """
+    data = request.json or {}
+    user_ids = presence_user_ids(data.get('userIds') or [])
+    if not user_ids:
+        return jsonify({'success': False, 'message': 'userIds required'}), 400
+    
+    now = datetime.now()
+    last_seen = presence.lookup(user_ids)
+    return jsonify({
+        'success': True,
+        'presence': [[u, presence.is_online(ts, now), ts.isoformat() if ts else None] for u, ts in last_seen.items()]
+    })
+
+@app.route('/api/presence/stream', methods=['GET'])
+def stream_presence():
+    """
+    Server-sent events for ?userIds=a,b,c
+    Sends one 'snapshot' event, then 'change' events with online/offline transitions only
+    """
+    user_ids = presence_user_ids(request.args.get('userIds', '').split(','))
+    if not user_ids:
+        return jsonify({'success': False, 'message': 'userIds required'}), 400
+    
+    last_seen = presence.lookup(user_ids)
+    
+    def events():
+        state = {u: presence.is_online(ts) for u, ts in last_seen.items()}
+        yield f"event: snapshot\ndata: {json.dumps(state)}\n\n"
+        while True:
+            presence.wait(PRESENCE_POLL_SECONDS)
+            now = datetime.now()
+            changes = {}
+            for u, ts in presence.snapshot(user_ids).items():
+                online = presence.is_online(ts, now)
+                if online != state[u]:
+                    state[u] = changes[u] = online
+            if changes:
+                yield f"event: change\ndata: {json.dumps(changes)}\n\n"
+            else:
+                yield ": keepalive\n\n"
+    
+    return Response(events(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/api/notifications', methods=['GET'])
 def get_notifications():
     """Get notifications for a user - supports query param userId"""
@@ -265,12 +754,27 @@ def get_notifications():
     if not user_id:
         return jsonify({'success': False, 'message': 'userId required'}), 400
     
+    try:
+        fields = requested_fields(NOTIFICATION_FIELDS, extra=('archived',))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
     # Get ALL notifications (both read and unread), sorted by newest first (by created_at)
-    notifications = Notification.query.filter_by(user_id=user_id).order_by(Notification.created_at.desc()).all()
-    print(f"Fetching notifications for user {user_id}: Found {len(notifications)} notifications")
-    for n in notifications:
-        print(f"  - {n.type}: {n.message} (read: {n.read}, created_at: {n.created_at})")
-    return jsonify([n.to_dict() for n in notifications])
+    query = Notification.query.filter_by(user_id=user_id).order_by(Notification.created_at.desc())
+    if fields:
+        result = select_fields(query, NOTIFICATION_FIELDS, fields)
+    else:
+        notifications = query.all()
+        print(f"Fetching notifications for user {user_id}: Found {len(notifications)} notifications")
+        for n in notifications:
+            print(f"  - {n.type}: {n.message} (read: {n.read}, created_at: {n.created_at})")
+        result = [n.to_dict() for n in notifications]
+    if request.args.get('includeArchived') in ('1', 'true'):
+        archived = (ArchivedNotification.query.filter_by(user_id=user_id)
+                    .order_by(ArchivedNotification.created_at.desc())
+                    .limit(request.args.get('archivedLimit', 100, type=int)).all())
+        result += [trim_fields(n.to_dict(), fields) for n in archived]
+    return jsonify(result)
 
 @app.route('/api/notifications/count', methods=['GET'])
 def get_notification_count():
@@ -281,15 +785,66 @@ def get_notification_count():
     count = Notification.query.filter_by(user_id=user_id, read=False).count()
     return jsonify({'count': count})
 
+@app.route('/api/dashboard', methods=['GET'])
+def get_dashboard():
+    """Everything the dashboard and navigation need on load, in one call"""
+    user_id = request.args.get('userId')
+    if not user_id:
+        return jsonify({'success': False, 'message': 'userId required'}), 400
+    
+    cached = dashboard_cache.get(user_id)
+    if cached is not None:
+        return jsonify(cached)
+    
+    user = User.query.get(user_id)
+    if not user:
+        return jsonify({'success': False, 'message': 'User not found'}), 404
+    
+    unread = Notification.query.filter_by(user_id=user_id, read=False).count()
+    
+    # Jobs I posted that are still open, and jobs locked in progress (as customer or worker)
+    open_postings, active_jobs = db.session.query(
+        db.func.sum(db.case((db.and_(Job.creator_id == user_id, Job.status.in_(['open', 'on_hold'])), 1), else_=0)),
+        db.func.sum(db.case((Job.status.in_(['locked', 'accepted']), 1), else_=0)),
+    ).filter(db.or_(Job.creator_id == user_id, Job.worker_id == user_id)).one()
+    
+    # Pending requests on my postings, and my own pending requests
+    received, sent = db.session.query(
+        db.func.sum(db.case((Job.creator_id == user_id, 1), else_=0)),
+        db.func.sum(db.case((JobApplication.worker_id == user_id, 1), else_=0)),
+    ).join(Job, Job.id == JobApplication.job_id).filter(
+        JobApplication.status == 'pending',
+        db.or_(Job.creator_id == user_id, JobApplication.worker_id == user_id)
+    ).one()
+    
+    result = {
+        'success': True,
+        'user': user.to_dict(),
+        'credits': user.credits,
+        'rating': user.rating,
+        'reviewCount': user.reviewCount,
+        'unreadNotifications': unread,
+        'openPostings': open_postings or 0,
+        'pendingApplicationsReceived': received or 0,
+        'pendingApplicationsSent': sent or 0,
+        'activeJobs': active_jobs or 0
+    }
+    dashboard_cache.set(user_id, result)
+    return jsonify(result)
+
 class Notification(db.Model):
-    id = db.Column(db.String(36), primary_key=True)
-    user_id = db.Column(db.String(36), db.ForeignKey('user.id'), nullable=False)
+    id = db.Column(UUIDKey, primary_key=True)
+    user_id = db.Column(UUIDKey, db.ForeignKey('user.id'), nullable=False, index=True)
     type = db.Column(db.String(50)) # request, accept, reject, message, info
     message = db.Column(db.String(500))
     timestamp = db.Column(db.String(50))
     created_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
-    related_id = db.Column(db.String(36), nullable=True) # e.g. job_id
+    related_id = db.Column(UUIDKey, nullable=True) # e.g. job_id
     read = db.Column(db.Boolean, default=False)
+    change_seq = db.Column(db.Integer, nullable=True, index=True) # Set by the delta sync triggers
+    partition_id = db.Column(db.Integer, nullable=True) # The related job's, else 0
+
+    __table_args__ = (db.Index('ix_notification_partition_created', 'partition_id', 'created_at'),)
 
     def to_dict(self):
         return {
@@ -302,10 +857,306 @@ class Notification(db.Model):
             'read': self.read
         }
 
+class CategorySubscription(db.Model):
+    """Reverse index from a job category to the users whose skills map to it"""
+    category = db.Column(db.String(50), primary_key=True)
+    user_id = db.Column(UUIDKey, db.ForeignKey('user.id'), primary_key=True, index=True)
+
+class UserSkill(db.Model):
+    """Skill index for worker search, rebuilt from skills_str when it changes"""
+    skill = db.Column(db.String(100), primary_key=True)
+    user_id = db.Column(UUIDKey, db.ForeignKey('user.id'), primary_key=True, index=True)
+
+class UserJobFeed(db.Model):
+    """Materialized recommendations, filled in when a job is posted"""
+    user_id = db.Column(UUIDKey, db.ForeignKey('user.id'), primary_key=True)
+    job_id = db.Column(UUIDKey, db.ForeignKey('job.id'), primary_key=True, index=True)
+    match_score = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
+
+    __table_args__ = (db.Index('ix_user_job_feed_user_score', 'user_id', 'match_score'),)
+
+class WorkHistoryEntry(db.Model):
+    """One row per job a worker completed, written by complete_job"""
+    id = db.Column(UUIDKey, primary_key=True)
+    user_id = db.Column(UUIDKey, db.ForeignKey('user.id'), nullable=False)
+    job_id = db.Column(UUIDKey, nullable=False, unique=True)
+    title = db.Column(db.String(100))
+    description = db.Column(db.String(500))
+    category = db.Column(db.String(50))
+    customerName = db.Column(db.String(100))
+    amount = db.Column(db.Integer, default=0)
+    rating = db.Column(db.Float, nullable=True)
+    review = db.Column(db.String(500), nullable=True)
+    completed_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
+
+    __table_args__ = (db.Index('ix_work_history_user_completed', 'user_id', 'completed_at'),)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'jobId': self.job_id,
+            'title': self.title,
+            'description': self.description,
+            'category': self.category,
+            'status': 'completed',
+            'date': self.completed_at.strftime("%Y-%m-%d"),
+            'amount': self.amount,
+            'rating': self.rating,
+            'review': self.review,
+            'customerName': self.customerName
+        }
+
+class EarningsRollup(db.Model):
+    """Completed jobs and earnings per worker per month (YYYY-MM)"""
+    user_id = db.Column(UUIDKey, db.ForeignKey('user.id'), primary_key=True)
+    month = db.Column(db.String(7), primary_key=True)
+    jobs = db.Column(db.Integer, default=0)
+    earnings = db.Column(db.Integer, default=0)
+
+class CategoryRollup(db.Model):
+    """Completed jobs and earnings per worker per job category"""
+    user_id = db.Column(UUIDKey, db.ForeignKey('user.id'), primary_key=True)
+    category = db.Column(db.String(50), primary_key=True)
+    jobs = db.Column(db.Integer, default=0)
+    earnings = db.Column(db.Integer, default=0)
+
+class RatingRollup(db.Model):
+    """How many reviews of each star value (1-5) a worker received"""
+    user_id = db.Column(UUIDKey, db.ForeignKey('user.id'), primary_key=True)
+    stars = db.Column(db.Integer, primary_key=True)
+    count = db.Column(db.Integer, default=0)
+
+class LedgerEntry(db.Model):
+    """Append-only credits ledger; rows are never updated or deleted"""
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False) # hold, payout, refund, reward, opening
+    user_id = db.Column(UUIDKey, nullable=True, index=True) # Whose credits change by `amount`
+    job_id = db.Column(UUIDKey, nullable=True, index=True) # Whose escrow changes by `escrow`
+    amount = db.Column(db.Integer, default=0, nullable=False)
+    escrow = db.Column(db.Integer, default=0, nullable=False)
+    note = db.Column(db.String(200), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'userId': self.user_id,
+            'jobId': self.job_id,
+            'amount': self.amount,
+            'escrow': self.escrow,
+            'note': self.note,
+            'createdAt': self.created_at.isoformat()
+        }
+
+class ArchivedMessage(db.Model):
+    """Message of a completed, expired or deleted job, moved out by the archiver"""
+    __bind_key__ = 'archive'
+    id = db.Column(UUIDKey, primary_key=True)
+    job_id = db.Column(UUIDKey, nullable=False, index=True)
+    sender_id = db.Column(UUIDKey, nullable=False)
+    content = db.Column(db.String(1000), nullable=True)
+    timestamp = db.Column(db.String(50))
+    read = db.Column(db.Boolean, default=False)
+    archived_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
+
+    def to_dict(self):
+        return dict(Message.to_dict(self), archived=True)
+
+class ArchivedNotification(db.Model):
+    """Old read notification (or one about a deleted job), moved out by the archiver"""
+    __bind_key__ = 'archive'
+    id = db.Column(UUIDKey, primary_key=True)
+    user_id = db.Column(UUIDKey, nullable=False)
+    type = db.Column(db.String(50))
+    message = db.Column(db.String(500))
+    timestamp = db.Column(db.String(50))
+    created_at = db.Column(db.DateTime, nullable=False)
+    related_id = db.Column(UUIDKey, nullable=True)
+    read = db.Column(db.Boolean, default=False)
+    archived_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
+
+    __table_args__ = (db.Index('ix_archived_notification_user_created', 'user_id', 'created_at'),)
+
+    def to_dict(self):
+        return dict(Notification.to_dict(self), archived=True)
+
+class SyncState(db.Model):
+    """Single row holding the global change sequence used by /api/sync"""
+    id = db.Column(db.Integer, primary_key=True)
+    value = db.Column(db.Integer, default=0, nullable=False)
+    # Tombstones up to this sequence were pruned; older tokens need a full resync
+    pruned_through = db.Column(db.Integer, default=0, nullable=False)
+
+class SyncTombstone(db.Model):
+    """A deleted job, application, message or notification, written by a trigger"""
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(30), nullable=False)
+    entity_id = db.Column(UUIDKey, nullable=False)
+    owner_id = db.Column(UUIDKey, nullable=True) # Only set for per-user rows (notifications)
+    change_seq = db.Column(db.Integer, nullable=False, index=True)
+    deleted_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
+
+# Sparse Fieldsets
+# List endpoints accept ?fields=id,title,... Each response field names the
+# columns it is built from, so a sparse request selects only those columns and
+# turns rows straight into dicts instead of constructing full ORM objects.
+def column_field(column):
+    return ([column], lambda row: getattr(row, column.key))
+
+# Response field -> (columns, build value from a row); same order as to_dict
+JOB_FIELDS = OrderedDict([
+    ('id', column_field(Job.id)),
+    ('title', column_field(Job.title)),
+    ('description', column_field(Job.description)),
+    ('category', column_field(Job.category)),
+    ('amount', ([Job.min_amount, Job.max_amount], lambda row: {'min': row.min_amount, 'max': row.max_amount})),
+    ('location', column_field(Job.location)),
+    ('deliveryType', column_field(Job.deliveryType)),
+    ('urgency', column_field(Job.urgency)),
+    ('paymentMode', column_field(Job.paymentMode)),
+    ('customerName', column_field(Job.customerName)),
+    ('customerRating', column_field(Job.customerRating)),
+    ('postedAt', column_field(Job.postedAt)),
+    ('status', column_field(Job.status)),
+    ('creator_id', column_field(Job.creator_id)),
+    ('escrowHeld', ([Job.escrow_held], lambda row: row.escrow_held or 0)),
+])
+
+MESSAGE_FIELDS = OrderedDict([
+    ('id', column_field(Message.id)),
+    ('jobId', column_field(Message.job_id)),
+    ('senderId', column_field(Message.sender_id)),
+    ('content', column_field(Message.content)),
+    ('timestamp', column_field(Message.timestamp)),
+    ('read', column_field(Message.read)),
+])
+
+NOTIFICATION_FIELDS = OrderedDict([
+    ('id', column_field(Notification.id)),
+    ('userId', column_field(Notification.user_id)),
+    ('type', column_field(Notification.type)),
+    ('message', column_field(Notification.message)),
+    ('timestamp', ([Notification.timestamp, Notification.created_at], lambda row: row.timestamp or (
+        row.created_at.strftime("%Y-%m-%d %I:%M %p") if row.created_at else ""))),
+    ('relatedId', column_field(Notification.related_id)),
+    ('read', column_field(Notification.read)),
+])
+
+def requested_fields(registry, extra=()):
+    """
+    Field names from ?fields=, or None when the full objects are wanted.
+    `extra` lists endpoint-specific keys that may also be requested.
+    Raises ValueError for unknown names.
+    """
+    spec = request.args.get('fields')
+    if not spec:
+        return None
+    names = list(dict.fromkeys(name.strip() for name in spec.split(',') if name.strip()))
+    unknown = [name for name in names if name not in registry and name not in extra]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return names
+
+def select_fields(query, registry, names, with_rows=False):
+    """
+    Run `query` selecting only the columns behind `names` (plus the id column).
+    Returns dicts, or (row, dict) pairs with with_rows=True.
+    """
+    columns = list(registry['id'][0])
+    for name in names:
+        for column in registry.get(name, ([], None))[0]:
+            if not any(column is c for c in columns):
+                columns.append(column)
+    built = [(row, {name: registry[name][1](row) for name in names if name in registry})
+             for row in query.with_entities(*columns)]
+    return built if with_rows else [item for _, item in built]
+
+def trim_fields(item, names):
+    """Drop keys of an already-built dict that were not requested"""
+    if not names:
+        return item
+    return {key: value for key, value in item.items() if key in names}
+
 # Initialize Database
+def ensure_columns():
+    """
+    Add columns and indexes introduced after a table was first created
+    (create_all only creates missing tables, it never alters existing ones)
+    """
+    inspector = db.inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        existing = {c['name'] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                column_type = column.type.compile(db.engine.dialect)
+                db.session.execute(db.text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+                print(f"Added column {table.name}.{column.name}")
+    db.session.commit()
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+
+def backfill_regions():
+    """Resolve region IDs for users and jobs saved before the gazetteer existed"""
+    for user in User.query.filter(User.region_id == None, User.address != None):
+        user.region_id = resolve_user_region(user.address)
+    for job in Job.query.filter(Job.region_id == None, Job.location != None):
+        job.region_id = gazetteer.resolve(job.location)
+    db.session.commit()
+
+def backfill_job_created_at():
+    """Fill Job.created_at from the display string postedAt for older jobs"""
+    for job in Job.query.filter(Job.created_at == None):
+        job.created_at = datetime.fromtimestamp(parse_posted_at(job.postedAt))
+    db.session.commit()
+
+def key_columns(metadata):
+    """{table name: [UUIDKey column names]}"""
+    return {table.name: [c.name for c in table.columns if isinstance(c.type, UUIDKey)]
+            for table in metadata.sorted_tables}
+
+def compact_keys(engine, metadata):
+    """
+    Rewrite text UUIDs in every key column as blobs, in one transaction per
+    database file. Runs once (tracked in PRAGMA user_version) and must finish
+    before the app serves requests, since blob and text keys never compare equal.
+    Returns the number of rows rewritten.
+    """
+    converted = 0
+    with engine.begin() as conn:
+        if conn.exec_driver_sql('PRAGMA user_version').scalar() >= KEY_FORMAT_VERSION:
+            return 0
+        conn.connection.driver_connection.create_function('compact_uuid', 1, uuid_to_key, deterministic=True)
+        # The delta sync triggers would restamp every row; init_db reinstalls them
+        for table in metadata.tables:
+            for action in ('insert', 'update', 'delete'):
+                conn.exec_driver_sql(f'DROP TRIGGER IF EXISTS {table}_sync_{action}')
+        for table, columns in key_columns(metadata).items():
+            if not columns:
+                continue
+            assignments = ', '.join(f'"{c}" = compact_uuid("{c}")' for c in columns)
+            text_keys = ' OR '.join(f'typeof("{c}") = \'text\'' for c in columns)
+            converted += conn.exec_driver_sql(f'UPDATE "{table}" SET {assignments} WHERE {text_keys}').rowcount
+        conn.exec_driver_sql(f'PRAGMA user_version = {KEY_FORMAT_VERSION}')
+    return converted
+
 def init_db():
     with app.app_context():
         db.create_all()
+        ensure_columns()
+        for bind_key, metadata in db.metadatas.items():
+            converted = compact_keys(db.engines[bind_key], metadata)
+            if converted:
+                print(f"Compacted keys in {converted} rows ({bind_key or 'main'} database)")
+        install_sync_triggers()
+        backfill_change_seq()
+        backfill_regions()
+        backfill_partitions()
+        backfill_job_created_at()
+        backfill_ledger()
+        backfill_skill_index()
         # Dummy data removed as per user request
 
 @app.route('/api/login', methods=['POST'])
@@ -361,6 +1212,7 @@ def register():
             email=data.get('email').lower().strip() if data.get('email') else None,
             phone=data.get('phone'),
             address=data.get('address'),
+            region_id=resolve_user_region(data.get('address')),
             aadhaarLast4=data.get('aadhaarLast4'),
             gender=data.get('gender'),
             credits=0,
@@ -382,12 +1234,32 @@ def register():
 
 @app.route('/api/jobs', methods=['GET'])
 def get_jobs():
+    try:
+        fields = requested_fields(JOB_FIELDS)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     # Fetch both open and on_hold jobs so users can see the status
-    jobs = Job.query.filter(Job.status.in_(['open', 'on_hold'])).all()
+    query = Job.query.filter(Job.status.in_(['open', 'on_hold']))
+    if fields:
+        return jsonify(select_fields(query, JOB_FIELDS, fields))
+    jobs = query.all()
     # Also check if current user has applied? (Frontend handles this by fetching applications)
     return jsonify([job.to_dict() for job in jobs])
 
 # AI Matching Algorithm
+# Skill to category mapping
+SKILL_CATEGORY_MAP = {
+    'Stitching & Tailoring': ['Tailoring', 'Handicrafts'],
+    'Handicrafts': ['Handicrafts', 'Creative Work'],
+    'Tutoring & Education': ['Education', 'Office Work'],
+    'Beauty Services': ['Beauty & Wellness'],
+    'Elderly Care': ['Caregiving'],
+    'Data Entry': ['Office Work', 'Digital Services'],
+    'Content Writing': ['Creative Work', 'Digital Services', 'Office Work'],
+    'Graphic Design': ['Creative Work', 'Digital Services'],
+    'Social Media Management': ['Digital Services', 'Creative Work']
+}
+
 def calculate_skill_match(user_skills, job_category):
     """
     Calculate skill match score between user skills and job category
@@ -396,23 +1268,10 @@ def calculate_skill_match(user_skills, job_category):
     if not user_skills or not job_category:
         return 0
     
-    # Skill to category mapping
-    skill_category_map = {
-        'Stitching & Tailoring': ['Tailoring', 'Handicrafts'],
-        'Handicrafts': ['Handicrafts', 'Creative Work'],
-        'Tutoring & Education': ['Education', 'Office Work'],
-        'Beauty Services': ['Beauty & Wellness'],
-        'Elderly Care': ['Caregiving'],
-        'Data Entry': ['Office Work', 'Digital Services'],
-        'Content Writing': ['Creative Work', 'Digital Services', 'Office Work'],
-        'Graphic Design': ['Creative Work', 'Digital Services'],
-        'Social Media Management': ['Digital Services', 'Creative Work']
-    }
-    
     max_score = 0
     for skill in user_skills:
-        if skill in skill_category_map:
-            matching_categories = skill_category_map[skill]
+        if skill in SKILL_CATEGORY_MAP:
+            matching_categories = SKILL_CATEGORY_MAP[skill]
             if job_category in matching_categories:
                 max_score = max(max_score, 100)  # Perfect match
             elif any(cat.lower() in job_category.lower() or job_category.lower() in cat.lower() for cat in matching_categories):
@@ -420,26 +1279,350 @@ def calculate_skill_match(user_skills, job_category):
     
     return max_score
 
-def calculate_location_match(user_location, job_location):
+# Location Gazetteer
+# Regions and the resolver are in gazetteer.py
+gazetteer = Gazetteer(REGIONS)
+
+def resolve_user_region(address):
+    """Region ID for a user's address ("Online" only makes sense for jobs)"""
+    region_id = gazetteer.resolve(address)
+    return None if region_id == ONLINE_REGION_ID else region_id
+
+def calculate_location_score(user_location, job_location):
     """
-    Simple location matching based on city names
-    Returns True if locations match or are nearby
+    Location fit between a user address and a job location
+    Returns 1.0 for the same place, 0.5 for nearby/online/unspecified, 0.0 otherwise
     """
     if not user_location or not job_location:
-        return True  # If no location specified, don't filter
+        return 0.5  # If no location specified, don't filter
     
+    job_region = gazetteer.resolve(job_location)
+    if job_region == ONLINE_REGION_ID:
+        return 0.5  # Online work can be done from anywhere
+    
+    user_region = resolve_user_region(user_location)
+    if user_region is not None and job_region is not None:
+        return gazetteer.affinity(user_region, job_region)
+    
+    # Place not in the gazetteer: fall back to comparing the text
     user_loc = user_location.lower().strip()
     job_loc = job_location.lower().strip()
-    
-    # Exact match
     if user_loc == job_loc:
-        return True
-    
-    # Check if one contains the other (e.g., "Hyderabad" in "Hyderabad, Telangana")
+        return 1.0
     if user_loc in job_loc or job_loc in user_loc:
-        return True
+        return 0.5
+    return 0.0
+
+def calculate_location_match(user_location, job_location):
+    """
+    Location matching based on gazetteer regions
+    Returns True if locations match or are nearby
+    """
+    return calculate_location_score(user_location, job_location) > 0
+
+def score_job_for_user(user, user_skills, job):
+    """
+    Score a job for a user with the recommendation rules.
+    Returns the match score, or None if the job should not be recommended
+    """
+    # Skip jobs created by the user
+    if job.creator_id == user.id:
+        return None
+    
+    skill_score = calculate_skill_match(user_skills, job.category)
+    
+    # Only include jobs with skill match > 30% or if user has no skills set
+    if skill_score >= 30 or len(user_skills) == 0:
+        if calculate_location_match(user.address, job.location):
+            return skill_score
+    return None
+
+# Job Ranking
+# The vectorized feature store is in ranking.py. It is loaded with the open
+# jobs on first use and kept in sync by index_open_job/unindex_job.
+
+# Relative weight of each feature in the final rank score (0-100)
+app.config.setdefault('RANKING_WEIGHTS', dict(DEFAULT_RANKING_WEIGHTS))
+
+def open_jobs():
+    """Jobs that can still be recommended"""
+    return Job.query.filter(Job.status.in_(FEED_JOB_STATUSES)).all()
+
+job_ranker = JobRanker(parse_skills, calculate_skill_match, calculate_location_score)
+
+# Duplicate Job Detection
+# Customers often repost a job with small edits. Each open job gets a MinHash
+# signature of the 4-byte shingles of its title and description; the signature
+# is split into bands and every band, together with the customer's ID, is a
+# bucket key (LSH). A new posting is only compared with that customer's jobs
+# sharing at least one bucket, so the lookup cost does not grow with the
+# number of open jobs. Similar text alone does not make a repeat: the category,
+# the location and every number in the text ("2 blouses" vs "3 blouses") must
+# match too, since those are separate orders.
+app.config.setdefault('DUPLICATE_JOB_THRESHOLD', 0.8) # Estimated Jaccard similarity
+# What create_job does with a near-duplicate of the same customer's open job:
+# 'flag' creates the job and reports the match, 'merge' updates the existing
+# job instead, 'reject' refuses it with 409. Clients can override with
+# onDuplicate; merging only happens when they ask for it.
+app.config.setdefault('DUPLICATE_JOB_POLICY', 'flag')
+
+def job_shingles(title, description):
+    """
+    Distinct 4-byte shingles of a job's normalized title and description,
+    each packed into one integer (UTF-8, so any script works)
+    """
+    text = ' '.join(re.findall(r'\w+', f"{title or ''} {description or ''}".lower())).encode()
+    b = np.frombuffer(text.ljust(4), dtype=np.uint8).astype(np.uint64)
+    return np.unique(b[:-3] << 24 | b[1:-2] << 16 | b[2:-1] << 8 | b[3:])
+
+class JobDedupIndex:
+    """In-memory MinHash/LSH index over open jobs"""
+
+    def __init__(self, num_perm=64, bands=16, seed=7):
+        rng = np.random.default_rng(seed)
+        # Multiply-shift hashes: high 32 bits of (a*x + b) mod 2^64, with odd a
+        self.a = rng.integers(0, 1 << 63, size=(num_perm, 1), dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.b = rng.integers(0, 1 << 63, size=(num_perm, 1), dtype=np.uint64)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()  # Only one caller builds the index
+        self.loaded = False
+        self._pending = None  # Changes made while the index is being built
+        self.signatures = {}  # job_id -> (signature, creator_id)
+        self.buckets = [{} for _ in range(bands)]  # per band: (creator_id, band bytes) -> set of job IDs
+
+    def signature(self, title, description):
+        shingles = job_shingles(title, description)
+        return ((self.a * shingles + self.b) >> np.uint64(32)).min(axis=1)
+
+    def _band_keys(self, signature, creator_id):
+        return [(creator_id, signature[i * self.rows:(i + 1) * self.rows].tobytes()) for i in range(self.bands)]
+
+    def _remove(self, job_id):
+        entry = self.signatures.pop(job_id, None)
+        if entry is None:
+            return
+        for band, key in zip(self.buckets, self._band_keys(*entry)):
+            members = band.get(key)
+            if members is not None:
+                members.discard(job_id)
+                if not members:
+                    del band[key]
+
+    def _upsert(self, job):
+        self._remove(job.id)
+        signature = self.signature(job.title, job.description)
+        self.signatures[job.id] = (signature, job.creator_id)
+        for band, key in zip(self.buckets, self._band_keys(signature, job.creator_id)):
+            band.setdefault(key, set()).add(job.id)
+
+    def load(self, jobs):
+        with self._lock:
+            self.signatures = {}
+            self.buckets = [{} for _ in range(self.bands)]
+            for job in jobs:
+                self._upsert(job)
+            # Replay postings and removals that happened while the jobs were read
+            for job_id, job in self._pending or ():
+                if job is None:
+                    self._remove(job_id)
+                else:
+                    self._upsert(job)
+            self._pending = None
+            self.loaded = True
+
+    def ensure_loaded(self):
+        """Build the index from the open jobs, once; concurrent callers wait for that build"""
+        if self.loaded:
+            return
+        with self._load_lock:
+            if self.loaded:
+                return
+            with self._lock:
+                self._pending = []
+            try:
+                self.load(open_jobs())
+            finally:
+                self._pending = None
+
+    def upsert(self, job):
+        with self._lock:
+            if self.loaded:
+                self._upsert(job)
+            elif self._pending is not None:
+                self._pending.append((job.id, SimpleNamespace(
+                    id=job.id, title=job.title, description=job.description, creator_id=job.creator_id)))
+
+    def remove(self, job_id):
+        with self._lock:
+            self._remove(job_id)
+            if self._pending is not None:
+                self._pending.append((job_id, None))
+
+    def find_duplicates(self, title, description, creator_id, threshold=None):
+        """
+        The creator's indexed jobs whose estimated similarity reaches the
+        threshold, as [(job_id, similarity)] best first
+        """
+        threshold = app.config['DUPLICATE_JOB_THRESHOLD'] if threshold is None else threshold
+        signature = self.signature(title, description)
+        with self._lock:
+            candidates = set()
+            for band, key in zip(self.buckets, self._band_keys(signature, creator_id)):
+                candidates.update(band.get(key, ()))
+            matches = []
+            for job_id in candidates:
+                similarity = float(np.mean(signature == self.signatures[job_id][0]))
+                if similarity >= threshold:
+                    matches.append((job_id, similarity))
+        matches.sort(key=lambda m: m[1], reverse=True)
+        return matches
+
+job_dedup = JobDedupIndex()
+
+def index_open_job(job):
+    """Add or refresh a job in the in-memory ranking and duplicate indexes"""
+    job_ranker.upsert(job)
+    job_dedup.upsert(job)
+
+def unindex_job(job_id):
+    """Drop a job that is no longer open from the in-memory indexes"""
+    job_ranker.remove(job_id)
+    job_dedup.remove(job_id)
+
+def warm_dedup_index():
+    """Build the duplicate index at startup instead of inside the first job posting"""
+    with app.app_context():
+        try:
+            started = time.time()
+            job_dedup.ensure_loaded()
+            print(f"Duplicate index: {len(job_dedup.signatures)} open jobs in {time.time() - started:.1f}s")
+        except Exception as e:
+            print(f"Error building duplicate index: {e}")
+
+def job_numbers(title, description):
+    """Numbers mentioned in a job's text, which tell otherwise identical orders apart"""
+    return sorted(re.findall(r'\d+', f"{title or ''} {description or ''}"))
+
+def find_open_duplicate(row):
+    """The same customer's open job that a new posting repeats, as (job, similarity)"""
+    job_dedup.ensure_loaded()
+    numbers = job_numbers(row['title'], row['description'])
+    for job_id, similarity in job_dedup.find_duplicates(row['title'], row['description'], row['creator_id']):
+        job = Job.query.get(job_id)
+        if (job and job.status == 'open' and job.category == row['category'] and job.location == row['location']
+                and job_numbers(job.title, job.description) == numbers):
+            return job, similarity
+    return None, None
+
+def merge_into_job(job, row):
+    """Refresh an open job with a reposting's details. Returns False if it is no longer open"""
+    values = {key: value for key, value in row.items() if key not in ('id', 'status', 'creator_id', 'customerRating', 'partition_id')}
+    values['created_at'] = datetime.now()
+    result = db.session.execute(
+        db.update(Job).where(Job.id == job.id, Job.status == 'open')
+        .values(**values).execution_options(synchronize_session='fetch'))
+    return result.rowcount == 1
+
+# Materialized Job Feeds
+# CategorySubscription maps each job category to the users whose skills cover it.
+# When a job is posted we look up only those users and write their feed rows,
+# so /api/jobs/recommended is an indexed read instead of a full rescore.
+# Placeholder subscription of users whose skills map to no category
+NO_CATEGORY = ''
+
+def related_categories(job_category):
+    """Mapped categories that match job_category exactly or partially"""
+    if not job_category:
+        return []
+    job_cat = job_category.lower()
+    all_categories = {cat for cats in SKILL_CATEGORY_MAP.values() for cat in cats}
+    return [cat for cat in all_categories if cat.lower() in job_cat or job_cat in cat.lower()]
+
+def update_subscriptions(user):
+    """Replace a user's category subscriptions from their current skills"""
+    CategorySubscription.query.filter_by(user_id=user.id).delete()
+    categories = {cat for skill in parse_skills(user.skills_str) for cat in SKILL_CATEGORY_MAP.get(skill, [])}
+    # Skills that map to no category still record that the feed was built
+    for category in categories or [NO_CATEGORY]:
+        db.session.add(CategorySubscription(category=category, user_id=user.id))
+
+def rebuild_user_feed(user):
+    """Recompute a user's feed from the open jobs in categories their skills match"""
+    UserJobFeed.query.filter_by(user_id=user.id).delete()
+    user_skills = parse_skills(user.skills_str)
+    if not user_skills:
+        return
     
-    return False
+    open_categories = [c for (c,) in db.session.query(Job.category).filter(Job.status.in_(['open', 'on_hold'])).distinct()]
+    categories = [c for c in open_categories if calculate_skill_match(user_skills, c) > 0]
+    if not categories:
+        return
+    
+    jobs = Job.query.filter(Job.status.in_(['open', 'on_hold']), Job.category.in_(categories))
+    if user.region_id is not None:
+        # Indexed region filter; unresolved locations still go through the text fallback
+        regions = gazetteer.family(user.region_id) | {ONLINE_REGION_ID}
+        jobs = jobs.filter(db.or_(Job.region_id.in_(regions), Job.region_id == None))
+    jobs = jobs.all()
+    for job in jobs:
+        score = score_job_for_user(user, user_skills, job)
+        if score is not None:
+            db.session.add(UserJobFeed(user_id=user.id, job_id=job.id, match_score=score))
+
+def fanout_job(job_id):
+    """Add a newly posted job to the feed of every subscribed user it matches"""
+    job = Job.query.get(job_id)
+    if not job:
+        return 0
+    
+    categories = related_categories(job.category)
+    if not categories:
+        return 0
+    
+    users = (User.query
+             .join(CategorySubscription, CategorySubscription.user_id == User.id)
+             .filter(CategorySubscription.category.in_(categories)))
+    if job.region_id not in (None, ONLINE_REGION_ID):
+        # Indexed region filter; users with unresolved addresses still go through the text fallback
+        users = users.filter(db.or_(User.region_id.in_(gazetteer.family(job.region_id)), User.region_id == None))
+    users = users.distinct().all()
+    
+    count = 0
+    for user in users:
+        score = score_job_for_user(user, parse_skills(user.skills_str), job)
+        if score is None:
+            continue
+        db.session.merge(UserJobFeed(user_id=user.id, job_id=job.id, match_score=score))
+        count += 1
+        
+        # "New jobs for you": only ping users whose skills match the category exactly
+        if score == 100:
+            db.session.add(Notification(
+                id=str(uuid.uuid4()),
+                user_id=user.id,
+                type='info',
+                message=f"New job for you: '{job.title}'",
+                timestamp=datetime.now().strftime("%Y-%m-%d %I:%M %p"),
+                related_id=job.id,
+                read=False
+            ))
+    db.session.commit()
+    return count
+
+def start_feed_fanout(*job_ids):
+    """Run fanout_job in a background thread so job creation returns immediately"""
+    def run():
+        with app.app_context():
+            for job_id in job_ids:
+                try:
+                    count = fanout_job(job_id)
+                    print(f"Job {job_id} added to {count} feeds")
+                except Exception as e:
+                    print(f"Error fanning out job {job_id}: {e}")
+                    db.session.rollback()
+    threading.Thread(target=run, daemon=True).start()
 
 @app.route('/api/jobs/recommended', methods=['GET'])
 def get_recommended_jobs():
@@ -450,50 +1633,168 @@ def get_recommended_jobs():
     
     if not user_id:
         return jsonify({'success': False, 'message': 'User ID required'}), 400
+    try:
+        fields = requested_fields(JOB_FIELDS, extra=('matchScore', 'rankScore'))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     
     user = User.query.get(user_id)
     if not user:
         return jsonify({'success': False, 'message': 'User not found'}), 404
     
-    # Get user skills
-    user_skills = []
-    try:
-        if user.skills_str:
-            s = user.skills_str.replace("'", '"')
-            if "[" in s:
-                user_skills = json.loads(s)
-    except:
-        user_skills = []
-    
-    # Get all open jobs
-    all_jobs = Job.query.filter(Job.status.in_(['open', 'on_hold'])).all()
+    user_skills = parse_skills(user.skills_str)
+    job_ranker.ensure_loaded(open_jobs)
     
-    # Filter and score jobs
-    recommended_jobs = []
-    for job in all_jobs:
-        # Skip jobs created by the user
-        if job.creator_id == user_id:
-            continue
-        
-        # Calculate skill match
-        skill_score = calculate_skill_match(user_skills, job.category)
-        
-        # Calculate location match
-        location_match = calculate_location_match(user.address, job.location)
+    if user_skills:
+        # Users from before feeds existed get subscribed and backfilled on first read
+        if not CategorySubscription.query.filter_by(user_id=user_id).first():
+            update_subscriptions(user)
+            rebuild_user_feed(user)
+            db.session.commit()
         
-        # Only include jobs with skill match > 30% or if user has no skills set
-        if skill_score >= 30 or len(user_skills) == 0:
-            if location_match:
-                job_dict = job.to_dict()
-                job_dict['matchScore'] = skill_score
-                recommended_jobs.append(job_dict)
+        # Candidates come from the materialized feed
+        candidate_ids = [job_id for (job_id,) in db.session.query(UserJobFeed.job_id).filter_by(user_id=user_id)]
+        ranked = job_ranker.score(user, candidate_ids, weights=app.config['RANKING_WEIGHTS'])
+    else:
+        # Without skills every open job in the user's area is a candidate
+        ranked = job_ranker.score(user, weights=app.config['RANKING_WEIGHTS'])
+    
+    if not ranked:
+        return jsonify([])
+    
+    query = Job.query.filter(Job.id.in_([r[0] for r in ranked]), Job.status.in_(['open', 'on_hold']))
+    if fields:
+        jobs = {row.id: job_dict for row, job_dict in select_fields(query, JOB_FIELDS, fields, with_rows=True)}
+    else:
+        jobs = {job.id: job.to_dict() for job in query}
     
-    # Sort by match score (highest first)
-    recommended_jobs.sort(key=lambda x: x['matchScore'], reverse=True)
+    # Highest rank score first; matchScore keeps the skill match percentage
+    recommended_jobs = []
+    for job_id, rank_score, skill_score in ranked:
+        if job_id in jobs:
+            job_dict = jobs[job_id]
+            job_dict['matchScore'] = skill_score
+            job_dict['rankScore'] = rank_score
+            recommended_jobs.append(trim_fields(job_dict, fields))
     
     return jsonify(recommended_jobs)
 
+# Worker Search
+# UserSkill is a (skill, user) index kept in step with skills_str, so skill
+# filters and per-skill facet counts are indexed GROUP BYs. Each facet is
+# counted with every filter except its own, so the counts show how many
+# workers picking another value of that facet would find.
+app.config.setdefault('WORKER_SEARCH_PAGE_SIZE', 20)
+
+# Public profile fields a search result may contain (no contact or ID details)
+USER_FIELDS = OrderedDict([
+    ('id', column_field(User.id)),
+    ('name', column_field(User.name)),
+    ('address', column_field(User.address)),
+    ('rating', column_field(User.rating)),
+    ('reviewCount', column_field(User.reviewCount)),
+    ('isVerified', column_field(User.isVerified)),
+    ('availability', column_field(User.availability)),
+    ('skills', ([User.skills_str], lambda row: parse_skills(row.skills_str))),
+    ('isOnline', ([User.last_seen], lambda row: PresenceTracker.is_online(row.last_seen))),
+    ('lastSeen', ([User.last_seen], lambda row: row.last_seen.isoformat() if row.last_seen else None)),
+])
+
+WORKER_SORTS = {
+    'rating': (User.rating.desc(), User.reviewCount.desc()),
+    'reviews': (User.reviewCount.desc(), User.rating.desc()),
+}
+
+def update_skill_index(user):
+    """Replace a user's UserSkill rows from their current skills_str"""
+    UserSkill.query.filter_by(user_id=user.id).delete()
+    for skill in dict.fromkeys(s.strip() for s in parse_skills(user.skills_str) if s and s.strip()):
+        db.session.add(UserSkill(skill=skill, user_id=user.id))
+
+def backfill_skill_index():
+    """Index skills of users saved before UserSkill existed"""
+    users = User.query.filter(User.skills_str != None, User.skills_str != '[]',
+                              ~db.exists().where(UserSkill.user_id == User.id))
+    for user in users:
+        update_skill_index(user)
+    db.session.commit()
+
+def arg_list(name):
+    """Values of a query parameter given repeatedly and/or comma-separated"""
+    return [v.strip() for value in request.args.getlist(name) for v in value.split(',') if v.strip()]
+
+def worker_search_filters():
+    """{facet name: SQL condition} from the query string. Raises ValueError on bad input"""
+    # Aliased so the skill facet, which selects from user_skill, does not correlate it away
+    any_skill = db.aliased(UserSkill)
+    filters = {'worker': db.exists().where(any_skill.user_id == User.id)}
+    skills = arg_list('skill')
+    if skills:
+        filters['skill'] = User.id.in_(db.select(UserSkill.user_id).where(UserSkill.skill.in_(skills)))
+    if request.args.get('minRating'):
+        try:
+            filters['rating'] = User.rating >= float(request.args['minRating'])
+        except ValueError:
+            raise ValueError('minRating must be a number')
+    availability = arg_list('availability')
+    if availability:
+        filters['availability'] = User.availability.in_(availability)
+    verified = request.args.get('verified')
+    if verified is not None:
+        filters['verified'] = User.isVerified == (verified in ('1', 'true'))
+    region = request.args.get('region')
+    if region:
+        region_id = int(region) if region.isdigit() else gazetteer.resolve(region)
+        if region_id is None or region_id not in gazetteer.regions:
+            raise ValueError(f"Unknown region: {region}")
+        filters['region'] = User.region_id.in_(gazetteer.within(region_id))
+    return filters
+
+def facet_counts(column, filters, exclude, join=None):
+    """{value: workers} for one facet, filtered by everything except `exclude`"""
+    query = db.session.query(column, db.func.count(User.id))
+    if join is not None:
+        query = query.select_from(join).join(User, User.id == join.user_id)
+    conditions = [condition for name, condition in filters.items() if name != exclude]
+    return {('unknown' if value is None else value): count
+            for value, count in query.filter(*conditions).group_by(column).order_by(db.func.count(User.id).desc())}
+
+@app.route('/api/workers/search', methods=['GET'])
+def search_workers():
+    """
+    Find workers for a customer.
+    Query params: skill, minRating, availability, verified, region,
+    sort=rating|reviews, limit, offset, fields
+    """
+    try:
+        filters = worker_search_filters()
+        fields = requested_fields(USER_FIELDS) or list(USER_FIELDS)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    sort = request.args.get('sort', 'rating')
+    if sort not in WORKER_SORTS:
+        return jsonify({'success': False, 'message': f"sort must be one of: {', '.join(WORKER_SORTS)}"}), 400
+    limit = max(1, min(request.args.get('limit', app.config['WORKER_SEARCH_PAGE_SIZE'], type=int), 100))
+    offset = max(0, request.args.get('offset', 0, type=int))
+
+    query = User.query.filter(*filters.values())
+    total = query.count()
+    page = query.order_by(*WORKER_SORTS[sort], User.id).offset(offset).limit(limit)
+    verified_counts = facet_counts(User.isVerified, filters, 'verified')
+    return jsonify({
+        'success': True,
+        'total': total,
+        'items': select_fields(page, USER_FIELDS, fields),
+        'nextOffset': offset + limit if offset + limit < total else None,
+        'facets': {
+            'skill': facet_counts(UserSkill.skill, filters, 'skill', join=UserSkill),
+            'availability': facet_counts(User.availability, filters, 'availability'),
+            'verified': {'true': verified_counts.get(True, 0), 'false': verified_counts.get(False, 0)},
+        }
+    })
+
 @app.route('/api/jobs/<job_id>/apply', methods=['POST'])
+@idempotent
 def apply_job(job_id):
     data = request.json
     print(f"\n=== APPLY JOB REQUEST ===")
@@ -543,6 +1844,13 @@ def apply_job(job_id):
             db.session.commit()
             print(f"Worker created")
 
+        # Claim the job before writing anything else. The conditional UPDATE takes
+        # the write lock, so concurrent applicants cannot both pass the 'open' check.
+        if not transition_job(job_id, 'apply'):
+            db.session.rollback()
+            print(f"ERROR: Job {job_id} was claimed by another request")
+            return jsonify({'success': False, 'message': 'Job no longer open'}), 400
+
         job_application = JobApplication(
             id=str(uuid.uuid4()),
             job_id=job_id,
@@ -585,8 +1893,7 @@ def apply_job(job_id):
         else:
             print(f"WARNING: No creator_id on job {job_id}")
         
-        # User Request: "if one worker request... make it hold"
-        job.status = 'on_hold'
+        # User Request: "if one worker request... make it hold" (done by transition_job above)
         db.session.commit()
         print(f"Job status updated to on_hold and committed")
         
@@ -603,15 +1910,6 @@ def apply_job(job_id):
         traceback.print_exc()
         db.session.rollback()
         return jsonify({'success': False, 'message': str(e)}), 500
-    job.status = 'on_hold'
-    db.session.commit()
-    
-    return jsonify({
-        'success': True, 
-        'message': 'Application sent. Job is now On Hold.',
-        'job': job.to_dict(),
-        'application': job_application.to_dict()
-    })
 
 @app.route('/api/jobs/<job_id>', methods=['GET'])
 def get_job(job_id):
@@ -628,21 +1926,50 @@ def get_my_postings():
     # Let's assume the Demo User (id=2) created the sample jobs for the sake of the workflow.
     # Update sample jobs to have creator_id='2' if not set.
     
-    jobs = Job.query.filter((Job.creator_id == user_id) | (Job.creator_id == None)).all()
+    try:
+        fields = requested_fields(JOB_FIELDS, extra=('applications',))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    query = Job.query.filter((Job.creator_id == user_id) | (Job.creator_id == None))
+    if fields:
+        result = []
+        for row, j_dict in select_fields(query, JOB_FIELDS, fields, with_rows=True):
+            if 'applications' in fields:
+                j_dict['applications'] = [a.to_dict() for a in JobApplication.query.filter_by(job_id=row.id)]
+            result.append(j_dict)
+        return jsonify(result)
+    jobs = query.all()
     
     result = []
     for job in jobs:
         j_dict = job.to_dict()
         # Get applications
-        apps = JobApplication.query.filter_by(job_id=job.id).all()
-        j_dict['applications'] = [a.to_dict() for a in apps]
-        result.append(j_dict)
+        if not fields or 'applications' in fields:
+            apps = JobApplication.query.filter_by(job_id=job.id).all()
+            j_dict['applications'] = [a.to_dict() for a in apps]
+        result.append(trim_fields(j_dict, fields))
         
     return jsonify(result)
 
 @app.route('/api/my-applications', methods=['POST'])
 def get_my_applications():
     user_id = request.json.get('userId')
+    try:
+        fields = requested_fields(JOB_FIELDS, extra=('myApplicationStatus', 'myApplicationId'))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    if fields:
+        apps = (db.session.query(JobApplication.id, JobApplication.job_id, JobApplication.status)
+                .filter_by(worker_id=user_id).all())
+        job_query = Job.query.filter(Job.id.in_({a.job_id for a in apps}))
+        jobs = {row.id: job_dict for row, job_dict in select_fields(job_query, JOB_FIELDS, fields, with_rows=True)}
+        results = []
+        for app in apps:
+            if app.job_id in jobs:
+                job_data = dict(jobs[app.job_id], myApplicationStatus=app.status, myApplicationId=app.id)
+                results.append(trim_fields(job_data, fields))
+        return jsonify(results)
     apps = JobApplication.query.filter_by(worker_id=user_id).all()
     
     results = []
@@ -652,27 +1979,36 @@ def get_my_applications():
             job_data = job.to_dict()
             job_data['myApplicationStatus'] = app.status  # pending, accepted, rejected
             job_data['myApplicationId'] = app.id
-            results.append(job_data)
+            results.append(trim_fields(job_data, fields))
             
     return jsonify(results)
 
-@app.route('/api/applications/<app_id>/accept', methods=['POST'])
-def accept_application(app_id):
+def accept_one_application(app_id):
+    """
+    Accept an application and lock its job, without committing.
+    Returns a result dict with success, jobId or message/status.
+    """
     application = JobApplication.query.get(app_id)
     if not application:
-        return 404
+        return {'id': app_id, 'success': False, 'message': 'Application not found', 'status': 404}
         
     # 2a. If Customer ACCEPTS: Set job_status = "LOCKED" (alias 'locked' or 'accepted')
-    application.status = 'accepted'
+    if not transition_application(app_id, 'pending', 'accepted'):
+        return {'id': app_id, 'success': False, 'message': 'Application already processed', 'status': 400}
     
     job = Job.query.get(application.job_id)
-    job.status = 'locked' 
-    job.worker_id = application.worker_id # Set approved_worker
+    # Set approved_worker and the escrow hold in the same conditional UPDATE as the lock
+    if not transition_job(job.id, 'accept', worker_id=application.worker_id, escrow_held=escrow_amount(job)):
+        # Undo our half of the change so the rest of a batch can still commit
+        transition_application(app_id, 'accepted', 'pending')
+        return {'id': app_id, 'success': False, 'message': 'Job is no longer on hold', 'status': 400}
+    record_escrow_hold(job.id)
     
     # Reject other applications (cleanup)
-    others = JobApplication.query.filter(JobApplication.job_id == job.id, JobApplication.id != app_id).all()
-    for o in others:
-        o.status = 'rejected'
+    others = db.session.query(JobApplication.worker_id).filter(JobApplication.job_id == job.id, JobApplication.id != app_id)
+    mark_dashboard_stale(*[worker_id for (worker_id,) in others])
+    JobApplication.query.filter(JobApplication.job_id == job.id, JobApplication.id != app_id).update(
+        {'status': 'rejected'}, synchronize_session=False)
 
     # Notify Worker: "Your request has been approved."
     notif = Notification(
@@ -684,83 +2020,171 @@ def accept_application(app_id):
         related_id=job.id
     )
     db.session.add(notif)
-        
-    db.session.commit()
-    return jsonify({'success': True})
+    return {'id': app_id, 'success': True, 'jobId': job.id}
 
-@app.route('/api/applications/<app_id>/reject', methods=['POST'])
-def reject_application(app_id):
+def reject_one_application(app_id, message="Your request has been rejected."):
+    """
+    Reject an application and re-open its job, without committing.
+    Returns a result dict with success, jobId or message/status.
+    """
     application = JobApplication.query.get(app_id)
     if not application:
-        return 404
+        return {'id': app_id, 'success': False, 'message': 'Application not found', 'status': 404}
         
-    application.status = 'rejected'
+    if not transition_application(app_id, 'pending', 'rejected'):
+        return {'id': app_id, 'success': False, 'message': 'Application already processed', 'status': 400}
     
     # 2b. If Customer REJECTS: Set job_status = "OPEN"
     job = Job.query.get(application.job_id)
-    # Reset to OPEN only if it was holding
-    if job.status == 'on_hold' or job.status == 'hold':
-        job.status = 'open'
-        job.worker_id = None # Clear approved worker if any
+    # Reset to OPEN only if it was holding (no-op otherwise); clear approved worker if any
+    transition_job(job.id, 'release', worker_id=None)
 
     # Notify Worker: "Your request has been rejected."
     notif = Notification(
         id=str(uuid.uuid4()),
         user_id=application.worker_id,
         type='reject',
-        message=f"Your request has been rejected.",
+        message=message,
         timestamp=datetime.now().strftime("%Y-%m-%d %I:%M %p"),
         related_id=job.id
     )
     db.session.add(notif)
+    return {'id': app_id, 'success': True, 'jobId': job.id}
 
+@app.route('/api/applications/<app_id>/accept', methods=['POST'])
+def accept_application(app_id):
+    result = accept_one_application(app_id)
+    if not result['success']:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': result['message']}), result['status']
     db.session.commit()
+    unindex_job(result['jobId'])  # Locked jobs are no longer recommended
     return jsonify({'success': True})
 
+@app.route('/api/applications/<app_id>/reject', methods=['POST'])
+def reject_application(app_id):
+    result = reject_one_application(app_id)
+    if not result['success']:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': result['message']}), result['status']
+    db.session.commit()
+    return jsonify({'success': True})
+
+@app.route('/api/applications/batch', methods=['POST'])
+def batch_applications():
+    """
+    Accept or reject many applications in one transaction
+    Body: {"action": "accept"|"reject", "applicationIds": [...]}
+    """
+    data = request.json or {}
+    action = data.get('action')
+    app_ids = data.get('applicationIds') or []
+    if action not in ('accept', 'reject') or not isinstance(app_ids, list) or not app_ids:
+        return jsonify({'success': False, 'message': 'action (accept/reject) and applicationIds required'}), 400
+    if len(app_ids) > BULK_MAX_ITEMS:
+        return jsonify({'success': False, 'message': f'At most {BULK_MAX_ITEMS} applications per batch'}), 400
+    
+    handler = accept_one_application if action == 'accept' else reject_one_application
+    try:
+        results = [handler(app_id) for app_id in app_ids]
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error in batch {action}: {e}")
+        return jsonify({'success': False, 'message': str(e)}), 500
+    
+    if action == 'accept':
+        for r in results:
+            if r['success']:
+                unindex_job(r['jobId'])
+    return jsonify({'success': True, 'results': results})
+
+def build_job_row(data):
+    """
+    Validate create-job input.
+    Returns (column values for a new Job, None) or (None, error message)
+    """
+    if not isinstance(data, dict):
+        return None, 'Job must be an object'
+    
+    # Validate required fields
+    if not data.get('title') or not data.get('category') or not data.get('description'):
+        return None, 'Title, category, and description are required'
+    
+    amount = data.get('amount') or {}
+    
+    try:
+        min_amount = int(float(amount.get('min', 0) or 0))
+        max_amount = int(float(amount.get('max', 0) or 0))
+    except (ValueError, TypeError, AttributeError):
+        return None, 'Invalid budget amount'
+    
+    if min_amount <= 0 or max_amount <= 0:
+        return None, 'Budget amounts must be greater than 0'
+    
+    if min_amount > max_amount:
+        return None, 'Minimum budget cannot exceed maximum budget'
+    
+    location = data.get('location', 'Online')
+    return {
+        'id': str(uuid.uuid4()),
+        'title': data.get('title'),
+        'description': data.get('description'),
+        'category': data.get('category'),
+        'min_amount': min_amount,
+        'max_amount': max_amount,
+        'location': location,
+        'region_id': gazetteer.resolve(location),
+        'partition_id': partition_key(gazetteer.resolve(location)),
+        'deliveryType': data.get('deliveryType', 'pickup'),
+        'urgency': data.get('urgency', 'flexible'),
+        'customerName': data.get('customerName'),
+        'customerRating': 0.0,
+        'postedAt': datetime.now().strftime("%Y-%m-%d %I:%M %p"),
+        'status': 'open',
+        'paymentMode': data.get('paymentMode', 'online'),
+        'creator_id': data.get('creatorId') # Store creator
+    }, None
+
 @app.route('/api/jobs', methods=['POST'])
+@idempotent
 def create_job():
     data = request.json
     print(f"Creating job with data: {data}")
     try:
-        # Validate required fields
-        if not data.get('title') or not data.get('category') or not data.get('description'):
-            return jsonify({'success': False, 'message': 'Title, category, and description are required'}), 400
-        
-        amount = data.get('amount', {})
+        row, error = build_job_row(data)
+        if error:
+            return jsonify({'success': False, 'message': error}), 400
         
-        try:
-            min_amount = int(float(amount.get('min', 0) or 0))
-            max_amount = int(float(amount.get('max', 0) or 0))
-        except (ValueError, TypeError):
-            return jsonify({'success': False, 'message': 'Invalid budget amount'}), 400
-        
-        if min_amount <= 0 or max_amount <= 0:
-            return jsonify({'success': False, 'message': 'Budget amounts must be greater than 0'}), 400
-        
-        if min_amount > max_amount:
-            return jsonify({'success': False, 'message': 'Minimum budget cannot exceed maximum budget'}), 400
+        policy = data.get('onDuplicate', app.config['DUPLICATE_JOB_POLICY'])
+        if policy not in ('merge', 'flag', 'reject'):
+            return jsonify({'success': False, 'message': 'onDuplicate must be merge, flag or reject'}), 400
+        duplicate, similarity = find_open_duplicate(row) if row['creator_id'] else (None, None)
+        if duplicate and policy == 'reject':
+            return jsonify({'success': False, 'message': 'You already have a similar open job',
+                            'duplicateOf': duplicate.id, 'similarity': similarity}), 409
+        if duplicate and policy == 'merge':
+            # Same category and location (see find_open_duplicate), so feeds stay valid
+            if merge_into_job(duplicate, row):
+                mark_dashboard_stale(duplicate.creator_id)
+                db.session.commit()
+                index_open_job(duplicate)
+                return jsonify({'success': True, 'job': duplicate.to_dict(), 'merged': True,
+                                'duplicateOf': duplicate.id, 'similarity': similarity})
+            # Taken by a worker in the meantime: post the new job after all
         
-        new_job = Job(
-            id=str(uuid.uuid4()),
-            title=data.get('title'),
-            description=data.get('description'),
-            category=data.get('category'),
-            min_amount=min_amount,
-            max_amount=max_amount,
-            location=data.get('location', 'Online'),
-            deliveryType=data.get('deliveryType', 'pickup'),
-            urgency=data.get('urgency', 'flexible'),
-            customerName=data.get('customerName'),
-            customerRating=0.0,
-            postedAt=datetime.now().strftime("%Y-%m-%d %I:%M %p"),
-            status='open',
-            paymentMode=data.get('paymentMode', 'online'),
-            creator_id=data.get('creatorId') # Store creator
-        )
+        new_job = Job(**row)
         db.session.add(new_job)
         db.session.commit()
         
-        return jsonify({'success': True, 'job': new_job.to_dict()}), 201
+        # Push the job into matching users' feeds in the background
+        index_open_job(new_job)
+        start_feed_fanout(new_job.id)
+        
+        response = {'success': True, 'job': new_job.to_dict()}
+        if duplicate:
+            response.update(duplicateOf=duplicate.id, similarity=similarity)
+        return jsonify(response), 201
     except Exception as e:
         print(f"Error creating job: {e}")
         import traceback
@@ -770,6 +2194,196 @@ def create_job():
 
 
 
+# Work History Rollups
+# complete_job appends a WorkHistoryEntry and bumps the worker's monthly,
+# per-category and rating counters with INSERT ... ON CONFLICT DO UPDATE, so
+# history and earnings reads never scan the job table.
+def increment_rollup(model, keys, **increments):
+    """Atomically add increments to a rollup row, creating it if missing"""
+    stmt = sqlite_insert(model).values(**keys, **increments)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(keys),
+        set_={name: getattr(model, name) + stmt.excluded[name] for name in increments}
+    )
+    db.session.execute(stmt)
+
+def apply_to_rollups(user_id, completed_at, category, amount, rating, jobs=1):
+    increment_rollup(EarningsRollup, {'user_id': user_id, 'month': completed_at.strftime("%Y-%m")}, jobs=jobs, earnings=amount)
+    increment_rollup(CategoryRollup, {'user_id': user_id, 'category': category or 'Other'}, jobs=jobs, earnings=amount)
+    if rating:
+        stars = min(5, max(1, int(round(float(rating)))))
+        increment_rollup(RatingRollup, {'user_id': user_id, 'stars': stars}, count=1)
+
+def record_completion(job, worker_id, amount, rating, review, completed_at=None):
+    """Add a completed job to the worker's history and rollups (same transaction as the caller)"""
+    completed_at = completed_at or datetime.now()
+    db.session.add(WorkHistoryEntry(
+        id=str(uuid.uuid4()),
+        user_id=worker_id,
+        job_id=job.id,
+        title=job.title,
+        description=job.description,
+        category=job.category,
+        customerName=job.customerName,
+        amount=amount,
+        rating=rating,
+        review=review,
+        completed_at=completed_at
+    ))
+    apply_to_rollups(worker_id, completed_at, job.category, amount, rating)
+
+def rebuild_work_rollups(chunk_size=500):
+    """
+    Recompute all rollups from scratch in chunks.
+    Completed jobs without a history entry (from before rollups existed) are
+    backfilled first; their ratings were never stored, so they count as unrated.
+    Run while the server is stopped or quiet: completions during a rebuild may be counted twice.
+    """
+    backfilled = 0
+    last_id = ''
+    while True:
+        jobs = (Job.query
+                .filter(Job.status == 'completed', Job.worker_id != None, Job.id > last_id)
+                .order_by(Job.id).limit(chunk_size).all())
+        if not jobs:
+            break
+        last_id = jobs[-1].id
+        recorded = {job_id for (job_id,) in db.session.query(WorkHistoryEntry.job_id).filter(WorkHistoryEntry.job_id.in_([j.id for j in jobs]))}
+        for job in jobs:
+            if job.id not in recorded:
+                db.session.add(WorkHistoryEntry(
+                    id=str(uuid.uuid4()), user_id=job.worker_id, job_id=job.id, title=job.title,
+                    description=job.description, category=job.category, customerName=job.customerName,
+                    amount=job.max_amount or 0, completed_at=datetime.fromtimestamp(parse_posted_at(job.postedAt))
+                ))
+                backfilled += 1
+        db.session.commit()
+    
+    for model in (EarningsRollup, CategoryRollup, RatingRollup):
+        model.query.delete()
+    db.session.commit()
+    
+    processed = 0
+    last_id = ''
+    while True:
+        entries = (WorkHistoryEntry.query
+                   .filter(WorkHistoryEntry.id > last_id)
+                   .order_by(WorkHistoryEntry.id).limit(chunk_size).all())
+        if not entries:
+            break
+        last_id = entries[-1].id
+        for entry in entries:
+            apply_to_rollups(entry.user_id, entry.completed_at, entry.category, entry.amount or 0, entry.rating)
+        db.session.commit()
+        processed += len(entries)
+    return backfilled, processed
+
+def work_summary(user_id):
+    """Totals and breakdowns for a worker, read straight from the rollups"""
+    by_month = EarningsRollup.query.filter_by(user_id=user_id).order_by(EarningsRollup.month.desc()).all()
+    by_category = CategoryRollup.query.filter_by(user_id=user_id).order_by(CategoryRollup.jobs.desc()).all()
+    ratings = {stars: 0 for stars in range(1, 6)}
+    for r in RatingRollup.query.filter_by(user_id=user_id):
+        ratings[r.stars] = r.count
+    return {
+        'completedJobs': sum(m.jobs for m in by_month),
+        'totalEarnings': sum(m.earnings for m in by_month),
+        'byMonth': [{'month': m.month, 'jobs': m.jobs, 'earnings': m.earnings} for m in by_month],
+        'byCategory': [{'category': c.category, 'jobs': c.jobs, 'earnings': c.earnings} for c in by_category],
+        'ratings': ratings
+    }
+
+def recent_work_history(user_id, limit=20, before=None):
+    query = WorkHistoryEntry.query.filter_by(user_id=user_id)
+    if before:
+        query = query.filter(WorkHistoryEntry.completed_at < before)
+    return query.order_by(WorkHistoryEntry.completed_at.desc()).limit(limit).all()
+
+@app.route('/api/users/<user_id>/work-history', methods=['GET'])
+def get_work_history(user_id):
+    """Completed jobs (newest first, paged with ?before=<iso date>) plus earnings and rating summary"""
+    try:
+        limit = min(int(request.args.get('limit', 20)), 100)
+        before = datetime.fromisoformat(request.args['before']) if request.args.get('before') else None
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Invalid limit or before'}), 400
+    
+    entries = recent_work_history(user_id, limit, before)
+    return jsonify({
+        'success': True,
+        'items': [e.to_dict() for e in entries],
+        'nextBefore': entries[-1].completed_at.isoformat() if len(entries) == limit else None,
+        'summary': work_summary(user_id)
+    })
+
+def iter_bulk_jobs():
+    """
+    Job dicts from a bulk upload: a JSON array, NDJSON lines or CSV rows.
+    NDJSON and CSV are read from the request stream line by line.
+    """
+    content_type = (request.content_type or '').split(';')[0].strip()
+    # @idempotent has already read the whole body to fingerprint it
+    stream = io.BytesIO(request.get_data()) if request.headers.get('Idempotency-Key') else request.stream
+    if content_type == 'application/x-ndjson':
+        for line in io.TextIOWrapper(stream, encoding='utf-8'):
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    yield 'Invalid JSON line'
+    elif content_type == 'text/csv':
+        # Columns: title, description, category, minAmount, maxAmount, location,
+        # deliveryType, urgency, paymentMode, customerName, creatorId
+        for row in csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8')):
+            row = {k: v for k, v in row.items() if v not in (None, '')}
+            row['amount'] = {'min': row.pop('minAmount', 0), 'max': row.pop('maxAmount', 0)}
+            yield row
+    else:
+        data = request.get_json(silent=True)
+        if not isinstance(data, list):
+            raise ValueError('Expected a JSON array of jobs')
+        yield from data
+
+@app.route('/api/jobs/bulk', methods=['POST'])
+@idempotent
+def create_jobs_bulk():
+    """
+    Create many jobs in one transaction (JSON array, NDJSON or CSV upload)
+    Each item is validated like POST /api/jobs; returns a result per item
+    """
+    rows, results = [], []
+    try:
+        for index, data in enumerate(iter_bulk_jobs()):
+            if index >= BULK_MAX_ITEMS:
+                return jsonify({'success': False, 'message': f'At most {BULK_MAX_ITEMS} jobs per upload'}), 400
+            row, error = build_job_row(data) if not isinstance(data, str) else (None, data)
+            if error:
+                results.append({'index': index, 'success': False, 'message': error})
+            else:
+                rows.append(row)
+                results.append({'index': index, 'success': True, 'jobId': row['id']})
+    except (ValueError, csv.Error, UnicodeDecodeError) as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    if rows:
+        try:
+            # One executemany INSERT for the whole batch
+            db.session.execute(db.insert(Job), rows)
+            mark_dashboard_stale(*{row['creator_id'] for row in rows})
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error in bulk job import: {e}")
+            return jsonify({'success': False, 'message': str(e)}), 500
+        
+        job_ids = [row['id'] for row in rows]
+        for job in Job.query.filter(Job.id.in_(job_ids)):
+            index_open_job(job)
+        start_feed_fanout(*job_ids)
+    
+    created = len(rows)
+    return jsonify({'success': created > 0, 'created': created, 'failed': len(results) - created, 'results': results}), 201 if created else 400
+
 @app.route('/api/jobs/<job_id>/complete', methods=['POST'])
 def complete_job(job_id):
     data = request.json
@@ -778,7 +2392,24 @@ def complete_job(job_id):
     
     job = Job.query.get(job_id)
     if job:
-        job.status = 'completed'
+        # Agreed amount if the customer sends one, otherwise the posted maximum;
+        # checked before the job changes state
+        amount = data.get('amount')
+        if amount is None:
+            amount = job.max_amount or 0
+        else:
+            try:
+                amount = int(float(amount))
+            except (ValueError, TypeError, OverflowError):
+                return jsonify({'success': False, 'message': 'Invalid amount'}), 400
+            if amount <= 0:
+                return jsonify({'success': False, 'message': 'Amount must be greater than 0'}), 400
+            if job.max_amount and amount > job.max_amount:
+                return jsonify({'success': False, 'message': 'Amount cannot exceed the job budget'}), 400
+
+        # Only a locked job can be completed; a retried request must not reward twice
+        if not transition_job(job_id, 'complete'):
+            return jsonify({'success': False, 'message': 'Job cannot be completed'}), 400
         job.rating = rating
         job.review = review
         
@@ -787,7 +2418,12 @@ def complete_job(job_id):
         if worker:
             worker.rating = (worker.rating * worker.reviewCount + rating) / (worker.reviewCount + 1)
             worker.reviewCount += 1
-            worker.credits += 500 # Reward
+            
+            record_completion(job, worker.id, amount, rating, review)
+            
+            # Pay the worker out of escrow (any excess goes back to the customer) plus the reward
+            settle_escrow(job_id, worker.id, amount)
+            post_ledger_entry('reward', worker.id, job_id, amount=app.config['COMPLETION_REWARD_CREDITS'])
             
             # Notify Worker
             notif = Notification(
@@ -813,6 +2449,30 @@ def mark_notification_read(n_id):
         return jsonify({'success': True})
     return jsonify({'success': False, 'message': 'Notification not found'}), 404
 
+@app.route('/api/notifications/batch-read', methods=['POST'])
+def mark_notifications_read_batch():
+    """Mark the given notifications as read. Body: {"ids": [...]}"""
+    data = request.json or {}
+    ids = data.get('ids') or []
+    if not isinstance(ids, list) or not ids:
+        return jsonify({'success': False, 'message': 'ids required'}), 400
+    if len(ids) > BULK_MAX_ITEMS:
+        return jsonify({'success': False, 'message': f'At most {BULK_MAX_ITEMS} notifications per batch'}), 400
+    
+    found = dict(db.session.query(Notification.id, Notification.user_id).filter(Notification.id.in_(ids)).all())
+    if found:
+        Notification.query.filter(Notification.id.in_(list(found))).update({'read': True}, synchronize_session=False)
+        mark_dashboard_stale(*found.values())
+        db.session.commit()
+    
+    results = []
+    for n_id in ids:
+        if n_id in found:
+            results.append({'id': n_id, 'success': True})
+        else:
+            results.append({'id': n_id, 'success': False, 'message': 'Notification not found'})
+    return jsonify({'success': True, 'results': results})
+
 @app.route('/api/notifications/mark-all-read', methods=['POST'])
 def mark_all_notifications_read():
     """Mark all notifications as read for a user"""
@@ -822,6 +2482,7 @@ def mark_all_notifications_read():
         return jsonify({'success': False, 'message': 'userId required'}), 400
     
     Notification.query.filter_by(user_id=user_id, read=False).update({'read': True})
+    mark_dashboard_stale(user_id)
     db.session.commit()
     return jsonify({'success': True})
 
@@ -834,10 +2495,15 @@ def cancel_application(app_id):
         
     job = Job.query.get(application.job_id)
     
-    # Allow cancel if pending
-    if application.status == 'pending':
-        # Remove the application
-        db.session.delete(application)
+    # Allow cancel if pending. The conditional DELETE loses cleanly if the
+    # customer accepts or rejects at the same moment.
+    result = db.session.execute(
+        db.delete(JobApplication)
+        .where(JobApplication.id == app_id, JobApplication.status == 'pending')
+        .execution_options(synchronize_session='fetch')
+    )
+    if result.rowcount == 1:
+        mark_dashboard_stale(application.worker_id, job.creator_id)
         
         # If this was the only application keeping the job "on_hold", check if we should open it?
         # Actually user logic was "if one worker request... make it hold".
@@ -845,7 +2511,7 @@ def cancel_application(app_id):
         other_apps = JobApplication.query.filter(JobApplication.job_id == job.id, JobApplication.id != app_id, JobApplication.status == 'pending').count()
         
         if other_apps == 0:
-            job.status = 'open' # Re-open the job
+            transition_job(job.id, 'release') # Re-open the job
             
         db.session.commit()
         return jsonify({'success': True})
@@ -861,8 +2527,11 @@ def delete_job(job_id):
     # Cascade delete applications? or keep them?
     # For now simple delete
     JobApplication.query.filter_by(job_id=job_id).delete()
+    UserJobFeed.query.filter_by(job_id=job_id).delete()
+    settle_escrow(job_id)  # Refund anything held for the customer
     db.session.delete(job)
     db.session.commit()
+    unindex_job(job_id)
     return jsonify({'success': True})
 
 
@@ -880,18 +2549,961 @@ def update_user(user_id):
     if 'name' in data: user.name = data['name']
     if 'email' in data: user.email = data['email']
     if 'phone' in data: user.phone = data['phone']
-    if 'address' in data: user.address = data['address']
+    if 'address' in data:
+        user.address = data['address']
+        user.region_id = resolve_user_region(user.address)
     if 'availability' in data: user.availability = data['availability']
-    if 'skills' in data: user.skills_str = json.dumps(data['skills'])
+    if 'skills' in data:
+        user.skills_str = json.dumps(data['skills'])
+        update_skill_index(user)
     if 'rating' in data: user.rating = data['rating']
     if 'reviewCount' in data: user.reviewCount = data['reviewCount']
-    if 'credits' in data: user.credits = data['credits']
+    # credits are read-only here; they only change through the ledger
+    
+    # Skills or address drive recommendations, so refresh the feed
+    if 'skills' in data or 'address' in data:
+        update_subscriptions(user)
+        rebuild_user_feed(user)
     
     db.session.commit()
     return jsonify({'success': True, 'user': user.to_dict()})
 
+# Credits Ledger
+# Every change to a user's credits or a job's escrow is an appended LedgerEntry.
+# User.credits and Job.escrow_held are cached snapshots of the ledger, bumped
+# with `column = column + delta` in the same transaction as the entry, so reads
+# stay O(1) and concurrent postings never overwrite each other. Escrow moves
+# guard on the held amount in the UPDATE itself, like transition_job. The
+# settlement pass settles leftover escrow and corrects any snapshot that has
+# drifted from the ledger.
+# Escrow is the customer's online payment, which never passed through credits:
+# holds, payouts to the worker and refunds to the customer only move `escrow`.
+# Credits are only created by rewards and opening balances, and the settlement
+# pass checks that every other kind of entry nets to zero.
+app.config.setdefault('COMPLETION_REWARD_CREDITS', 500)
+app.config.setdefault('SETTLEMENT_INTERVAL_SECONDS', 3600)
+app.config.setdefault('SETTLEMENT_CHUNK_SIZE', 500)
+
+# Entry kinds that may change a user's credits
+CREDIT_ENTRY_KINDS = ('reward', 'opening')
+
+def post_ledger_entry(kind, user_id=None, job_id=None, amount=0, escrow=0, note=None):
+    """Append an entry and apply it to the cached balances, without committing"""
+    if amount and kind not in CREDIT_ENTRY_KINDS:
+        raise ValueError(f"Ledger entries of kind '{kind}' cannot change credits")
+    db.session.add(LedgerEntry(kind=kind, user_id=user_id, job_id=job_id, amount=amount, escrow=escrow, note=note))
+    if amount and user_id:
+        User.query.filter_by(id=user_id).update(
+            {User.credits: db.func.coalesce(User.credits, 0) + amount}, synchronize_session='fetch')
+        mark_dashboard_stale(user_id)
+
+def escrow_amount(job):
+    """What accepting a job puts into escrow: its posted maximum, for online payment only"""
+    if (job.paymentMode or 'online') != 'online':
+        return 0
+    return max(job.max_amount or job.min_amount or 0, 0)
+
+def record_escrow_hold(job_id):
+    """Ledger side of the hold that transition_job('accept', escrow_held=...) made"""
+    job = db.session.get(Job, job_id)
+    if job.escrow_held:
+        post_ledger_entry('hold', job.creator_id, job_id, escrow=job.escrow_held)
+
+def settle_escrow(job_id, worker_id=None, amount=None):
+    """
+    Empty a job's escrow: up to `amount` (default all) is paid out to the
+    worker and the rest refunded to the customer's payment method, outside
+    credits. Returns (released, refunded);
+    (0, 0) when nothing was held or another request settled it first.
+    """
+    job = db.session.get(Job, job_id)
+    held = job.escrow_held or 0
+    if held <= 0:
+        return 0, 0
+    result = db.session.execute(
+        db.update(Job).where(Job.id == job_id, Job.escrow_held == held)
+        .values(escrow_held=0).execution_options(synchronize_session='fetch'))
+    if result.rowcount != 1:
+        return 0, 0
+    released = min(held, amount if amount is not None else held) if worker_id else 0
+    if released:
+        post_ledger_entry('payout', worker_id, job_id, escrow=-released)
+    refunded = held - released
+    if refunded:
+        post_ledger_entry('refund', job.creator_id, job_id, escrow=-refunded)
+    return released, refunded
+
+def backfill_ledger():
+    """Opening entries for credits granted before the ledger existed"""
+    users = User.query.filter(User.credits != 0, User.credits != None,
+                              ~db.exists().where(LedgerEntry.user_id == User.id))
+    for user_id, credits in users.with_entities(User.id, User.credits).all():
+        db.session.add(LedgerEntry(kind='opening', user_id=user_id, amount=credits))
+    db.session.commit()
+
+def unbacked_credits():
+    """Net credits of entries other than rewards and openings; anything but 0 means credits were minted"""
+    return (db.session.query(db.func.coalesce(db.func.sum(LedgerEntry.amount), 0))
+            .filter(LedgerEntry.kind.notin_(CREDIT_ENTRY_KINDS)).scalar())
+
+def settle_open_escrow(chunk_size):
+    """Release escrow left on completed jobs and refund it on jobs that are no longer locked"""
+    settled = 0
+    last_id = ''
+    while True:
+        jobs = (db.session.query(Job.id, Job.status, Job.worker_id)
+                .filter(Job.escrow_held > 0, Job.status.notin_(['locked', 'accepted']), Job.id > last_id)
+                .order_by(Job.id).limit(chunk_size).all())
+        if not jobs:
+            break
+        last_id = jobs[-1].id
+        for job_id, status, worker_id in jobs:
+            if any(settle_escrow(job_id, worker_id if status == 'completed' else None)):
+                settled += 1
+        db.session.commit()
+    return settled
+
+def reconcile_balances(chunk_size):
+    """Reset user credits and job escrow snapshots that differ from their ledger sums"""
+    fixed = 0
+    for model, column, ledger_key, delta in ((User, User.credits, LedgerEntry.user_id, LedgerEntry.amount),
+                                             (Job, Job.escrow_held, LedgerEntry.job_id, LedgerEntry.escrow)):
+        last_id = ''
+        while True:
+            ids = [row_id for (row_id,) in db.session.query(model.id).filter(model.id > last_id)
+                   .order_by(model.id).limit(chunk_size)]
+            if not ids:
+                break
+            last_id = ids[-1]
+            # Compared and corrected in one statement, so postings cannot slip in between
+            ledger_sum = (db.select(db.func.coalesce(db.func.sum(delta), 0))
+                          .where(ledger_key == model.id).scalar_subquery())
+            drifted = model.query.filter(model.id.in_(ids), db.func.coalesce(column, 0) != ledger_sum)
+            for row_id, cached in drifted.with_entities(model.id, column):
+                print(f"Settlement: {model.__tablename__} {row_id} snapshot {cached} differs from ledger")
+            fixed += drifted.update({column: ledger_sum}, synchronize_session=False)
+            db.session.commit()
+    return fixed
+
+def settle_credits():
+    """One settlement pass. Returns (escrows settled, snapshots corrected)"""
+    chunk_size = app.config['SETTLEMENT_CHUNK_SIZE']
+    settled, fixed = settle_open_escrow(chunk_size), reconcile_balances(chunk_size)
+    unbacked = unbacked_credits()
+    if unbacked:
+        print(f"Settlement: WARNING ledger holds {unbacked} credits not backed by rewards or openings")
+    return settled, fixed
+
+def settlement_job():
+    settled, fixed = settle_credits()
+    if settled or fixed:
+        return f"settled {settled} escrows, corrected {fixed} balances"
+
+@app.route('/api/users/<user_id>/credits', methods=['GET'])
+def get_credits(user_id):
+    """Current balance plus ledger entries (newest first, paged with ?before=<entry id>)"""
+    user = User.query.get(user_id)
+    if not user:
+        return jsonify({'success': False, 'message': 'User not found'}), 404
+    limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+    query = LedgerEntry.query.filter_by(user_id=user_id)
+    before = request.args.get('before', type=int)
+    if before:
+        query = query.filter(LedgerEntry.id < before)
+    entries = query.order_by(LedgerEntry.id.desc()).limit(limit).all()
+    return jsonify({
+        'success': True,
+        'balance': user.credits or 0,
+        'items': [e.to_dict() for e in entries],
+        'nextBefore': entries[-1].id if len(entries) == limit else None
+    })
+
+# Region Partitions
+# Jobs, applications, messages and notifications carry the partition of the
+# region their job was posted in: the job's state, or 0 for online jobs and
+# unknown places. It is fixed when the job is posted, and children copy it from
+# their job. Per-region work (the sweeper, the archiver) reads one partition at
+# a time through indexes that lead with partition_id, in short transactions,
+# so a busy city's backlog never holds the write lock for the others. Reads
+# that cross regions (a user's postings, applications and notifications) use
+# their own indexes on the owning user. Everything stays in one database, so a
+# request's writes to jobs, the ledger and rollups still commit together.
+def partition_key(region_id):
+    """Partition of jobs posted in a region"""
+    state = gazetteer.state(region_id) if region_id in gazetteer.regions else None
+    return state or 0
+
+def partition_keys(model=Job):
+    """Partitions that currently hold rows of a partitioned model"""
+    return [key for (key,) in db.session.query(model.partition_id).distinct().order_by(model.partition_id)]
+
+def job_partition(session, job_id):
+    """Partition of a job that is pending or loaded in the session, or else committed"""
+    job = session.identity_map.get(db.inspect(Job).identity_key_from_primary_key([job_id]))
+    if job is None:
+        job = next((obj for obj in session.new if isinstance(obj, Job) and obj.id == job_id), None)
+    if job is not None:
+        return job.partition_id
+    with session.no_autoflush:
+        return session.query(Job.partition_id).filter(Job.id == job_id).scalar()
+
+@db.event.listens_for(db.session, 'before_flush')
+def assign_partitions(session, flush_context, instances):
+    """New jobs get their region's partition; applications, messages and notifications follow their job"""
+    new = [obj for obj in session.new
+           if isinstance(obj, (Job, JobApplication, Message, Notification)) and obj.partition_id is None]
+    for obj in new:
+        if isinstance(obj, Job):
+            obj.partition_id = partition_key(obj.region_id)
+    for obj in new:
+        if not isinstance(obj, Job):
+            job_id = obj.related_id if isinstance(obj, Notification) else obj.job_id
+            key = job_partition(session, job_id) if job_id is not None else None
+            obj.partition_id = key or 0
+
+def backfill_partitions():
+    """Set partition_id on rows written before partitioning"""
+    regions = db.session.query(Job.region_id).filter(Job.partition_id == None).distinct().all()
+    for (region_id,) in regions:
+        (Job.query.filter(Job.partition_id == None, Job.region_id.is_(region_id))
+         .update({Job.partition_id: partition_key(region_id)}, synchronize_session=False))
+    for model, job_column in ((JobApplication, JobApplication.job_id), (Message, Message.job_id),
+                              (Notification, Notification.related_id)):
+        job_partition_id = db.select(Job.partition_id).where(Job.id == job_column).scalar_subquery()
+        (model.query.filter(model.partition_id == None)
+         .update({model.partition_id: db.func.coalesce(job_partition_id, 0)}, synchronize_session=False))
+    db.session.commit()
+
+# Stale Job Sweeper
+# A background thread periodically expires old open jobs and auto-rejects
+# requests the customer never answered, so on_hold jobs go back to open and
+# the open-job set that get_jobs/recommendations scan stays small.
+app.config.setdefault('SWEEP_INTERVAL_SECONDS', 600)
+app.config.setdefault('SWEEP_CHUNK_SIZE', 200)
+app.config.setdefault('JOB_TTL_HOURS', {
+    # Pending requests on an on_hold job the customer has not answered
+    'on_hold': 48,
+    # Open jobs with no taker, by urgency
+    'open': {'today': 24, 'tomorrow': 48, 'this_week': 8 * 24, 'flexible': 30 * 24},
+})
+
+def expire_open_jobs(now, chunk_size, partition):
+    """Expire a partition's open jobs older than their urgency's TTL and tell the customer"""
+    ttls = app.config['JOB_TTL_HOURS']['open']
+    expired = 0
+    for urgency, hours in ttls.items():
+        cutoff = now - timedelta(hours=hours)
+        # Jobs with an unknown urgency are treated as flexible
+        urgency_filter = Job.urgency == urgency if urgency != 'flexible' else db.or_(
+            Job.urgency == urgency, Job.urgency == None, Job.urgency.notin_(list(ttls)))
+        while True:
+            jobs = (Job.query
+                    .filter(Job.partition_id == partition, Job.status == 'open', Job.created_at < cutoff, urgency_filter)
+                    .order_by(Job.created_at).limit(chunk_size).all())
+            if not jobs:
+                break
+            expired_ids = []
+            for job in jobs:
+                if not transition_job(job.id, 'expire'):
+                    continue  # Someone applied in the meantime
+                expired_ids.append(job.id)
+                if job.creator_id:
+                    db.session.add(Notification(
+                        id=str(uuid.uuid4()),
+                        user_id=job.creator_id,
+                        type='info',
+                        message=f"Your job '{job.title}' expired without a worker. Post it again if you still need help.",
+                        timestamp=now.strftime("%Y-%m-%d %I:%M %p"),
+                        related_id=job.id
+                    ))
+            db.session.commit()
+            for job_id in expired_ids:
+                unindex_job(job_id)
+            expired += len(expired_ids)
+            if len(jobs) < chunk_size:
+                break
+    return expired
+
+def reject_stale_applications(now, chunk_size, partition):
+    """Auto-reject a partition's pending requests the customer left unanswered, re-opening their jobs"""
+    cutoff = (now - timedelta(hours=app.config['JOB_TTL_HOURS']['on_hold'])).strftime("%Y-%m-%d %H:%M")
+    rejected = 0
+    last_id = ''
+    while True:
+        apps = (db.session.query(JobApplication.id, Job.title, Job.creator_id)
+                .join(Job, Job.id == JobApplication.job_id)
+                .filter(JobApplication.partition_id == partition, JobApplication.status == 'pending',
+                        JobApplication.timestamp < cutoff, JobApplication.id > last_id)
+                .order_by(JobApplication.id).limit(chunk_size).all())
+        if not apps:
+            break
+        last_id = apps[-1].id
+        for app_id, title, creator_id in apps:
+            result = reject_one_application(
+                app_id, message=f"Your request for '{title}' expired because the customer did not respond.")
+            if not result['success']:
+                continue
+            rejected += 1
+            if creator_id:
+                db.session.add(Notification(
+                    id=str(uuid.uuid4()),
+                    user_id=creator_id,
+                    type='info',
+                    message=f"A request for '{title}' expired without a reply. The job is open again.",
+                    timestamp=now.strftime("%Y-%m-%d %I:%M %p"),
+                    related_id=result['jobId']
+                ))
+        db.session.commit()
+    return rejected
+
+def sweep_stale_jobs():
+    """One sweeper pass. Returns (rejected applications, expired jobs)"""
+    now = datetime.now()
+    chunk_size = app.config['SWEEP_CHUNK_SIZE']
+    rejected = expired = 0
+    for partition in partition_keys():
+        rejected += reject_stale_applications(now, chunk_size, partition)
+        # Jobs re-opened above are expired here if they are also past their TTL
+        expired += expire_open_jobs(now, chunk_size, partition)
+    return rejected, expired
+
+def sweeper_job():
+    rejected, expired = sweep_stale_jobs()
+    if rejected or expired:
+        return f"auto-rejected {rejected} requests, expired {expired} jobs"
+
+# Delta Sync
+# Every insert or update of a job, application, message or notification stamps
+# the row with the next value of a global change sequence, and every delete
+# leaves a tombstone. Both are done by SQLite triggers, so bulk UPDATEs, the
+# sweeper and executemany inserts are covered without touching each call site.
+# A client passes the last token it saw to /api/sync and receives only rows
+# with a higher sequence. SQLite has a single writer, so sequences are handed
+# out in commit order and a token never skips a row that commits later.
+app.config.setdefault('SYNC_PAGE_SIZE', 500)
+app.config.setdefault('SYNC_TOMBSTONE_RETENTION_DAYS', 30)
+
+# Response key -> model
+SYNC_ENTITIES = OrderedDict([
+    ('jobs', Job),
+    ('applications', JobApplication),
+    ('messages', Message),
+    ('notifications', Notification),
+])
+
+NEXT_CHANGE_SEQ = "UPDATE sync_state SET value = value + 1 WHERE id = 1;"
+CURRENT_CHANGE_SEQ = "(SELECT value FROM sync_state WHERE id = 1)"
+
+def install_sync_triggers():
+    """Create the change-sequence and tombstone triggers (idempotent)"""
+    db.session.execute(sqlite_insert(SyncState).values(id=1, value=0, pruned_through=0).on_conflict_do_nothing())
+    for model in SYNC_ENTITIES.values():
+        table = model.__tablename__
+        stamp = f'UPDATE "{table}" SET change_seq = {CURRENT_CHANGE_SEQ} WHERE rowid = NEW.rowid;'
+        owner = 'OLD.user_id' if model is Notification else 'NULL'
+        db.session.execute(db.text(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_sync_insert AFTER INSERT ON "{table}"
+            BEGIN {NEXT_CHANGE_SEQ} {stamp} END'''))
+        # The WHEN clause skips the trigger's own stamping UPDATE (and backfills)
+        db.session.execute(db.text(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_sync_update AFTER UPDATE ON "{table}"
+            WHEN NEW.change_seq IS OLD.change_seq
+            BEGIN {NEXT_CHANGE_SEQ} {stamp} END'''))
+        db.session.execute(db.text(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_sync_delete AFTER DELETE ON "{table}"
+            BEGIN {NEXT_CHANGE_SEQ}
+                INSERT INTO sync_tombstone (entity, entity_id, owner_id, change_seq, deleted_at)
+                VALUES ('{table}', OLD.id, {owner}, {CURRENT_CHANGE_SEQ},
+                        strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime'));
+            END'''))
+    db.session.commit()
+
+def backfill_change_seq():
+    """Give rows written before delta sync existed a sequence of their own"""
+    for model in SYNC_ENTITIES.values():
+        table = model.__tablename__
+        if not model.query.filter(model.change_seq == None).first():
+            continue
+        db.session.execute(db.text(
+            f'UPDATE "{table}" SET change_seq = {CURRENT_CHANGE_SEQ} + rowid WHERE change_seq IS NULL'))
+        db.session.execute(db.text(
+            f'UPDATE sync_state SET value = MAX(value, (SELECT MAX(change_seq) FROM "{table}")) WHERE id = 1'))
+    db.session.commit()
+
+def prune_sync_tombstones(now):
+    """Drop old tombstones; clients holding an older token are told to resync fully"""
+    cutoff = now - timedelta(days=app.config['SYNC_TOMBSTONE_RETENTION_DAYS'])
+    horizon = db.session.query(db.func.max(SyncTombstone.change_seq)).filter(SyncTombstone.deleted_at < cutoff).scalar()
+    if horizon is None:
+        return 0
+    pruned = SyncTombstone.query.filter(SyncTombstone.change_seq <= horizon).delete(synchronize_session=False)
+    state = SyncState.query.get(1)
+    state.pruned_through = max(state.pruned_through, horizon)
+    db.session.commit()
+    return pruned
+
+def sync_scopes(user_id):
+    """Filter selecting the rows of each entity that a user's client keeps locally"""
+    my_jobs = db.select(Job.id).where((Job.creator_id == user_id) | (Job.creator_id == None) | (Job.worker_id == user_id))
+    applied_jobs = db.select(JobApplication.job_id).where(JobApplication.worker_id == user_id)
+    return {
+        # Every job change matters: lists drop jobs that left open/on_hold
+        'jobs': None,
+        'applications': (JobApplication.worker_id == user_id) | JobApplication.job_id.in_(my_jobs),
+        'messages': Message.job_id.in_(my_jobs) | Message.job_id.in_(applied_jobs),
+        'notifications': Notification.user_id == user_id,
+    }
+
+def sync_changes(user_id, since, limit):
+    """
+    Rows changed after `since`, at most `limit` per entity. When an entity hits
+    the limit the returned token stops at the last row delivered for it, and
+    later rows of the other entities are left for the next call.
+    """
+    state = SyncState.query.get(1)
+    upto = state.value
+    reset = since is None or since < state.pruned_through or since > upto
+    if reset:
+        since = -1
+
+    token = upto
+    changes = {}
+    for key, scope in sync_scopes(user_id).items():
+        model = SYNC_ENTITIES[key]
+        query = model.query.filter(model.change_seq > since, model.change_seq <= upto)
+        if scope is not None:
+            query = query.filter(scope)
+        if model is JobApplication:
+            query = query.options(db.joinedload(JobApplication.worker), db.joinedload(JobApplication.job))
+        rows = query.order_by(model.change_seq).limit(limit).all()
+        if len(rows) == limit:
+            token = min(token, rows[-1].change_seq)
+        changes[key] = rows
+
+    # After a reset the client starts from scratch, so deletes are irrelevant
+    tombstones = []
+    if not reset:
+        tombstones = (SyncTombstone.query
+                      .filter(SyncTombstone.change_seq > since, SyncTombstone.change_seq <= upto,
+                              (SyncTombstone.owner_id == None) | (SyncTombstone.owner_id == user_id))
+                      .order_by(SyncTombstone.change_seq).limit(limit).all())
+        if len(tombstones) == limit:
+            token = min(token, tombstones[-1].change_seq)
+
+    entity_keys = {model.__tablename__: key for key, model in SYNC_ENTITIES.items()}
+    deleted = {key: [] for key in SYNC_ENTITIES}
+    for tombstone in tombstones:
+        if tombstone.change_seq <= token:
+            deleted[entity_keys[tombstone.entity]].append(tombstone.entity_id)
+
+    result = {key: [row.to_dict() for row in rows if row.change_seq <= token] for key, rows in changes.items()}
+    result.update({'deleted': deleted, 'token': str(token), 'reset': reset, 'hasMore': token < upto})
+    return result
+
+@app.route('/api/sync', methods=['GET'])
+def sync():
+    """Delta sync for offline clients: ?userId=...&since=<token from the previous call>"""
+    user_id = request.args.get('userId')
+    if not user_id:
+        return jsonify({'success': False, 'message': 'userId required'}), 400
+    since = request.args.get('since')
+    if since:
+        try:
+            since = int(since)
+        except ValueError:
+            return jsonify({'success': False, 'message': 'Invalid sync token'}), 400
+    else:
+        since = None  # First sync: everything in scope
+    limit = max(1, min(request.args.get('limit', app.config['SYNC_PAGE_SIZE'], type=int), 2000))
+    return jsonify(sync_changes(user_id, since, limit))
+
+# Archival
+# Conversations of completed, expired or deleted jobs and old read notifications
+# are moved to a separate archive database (SQLALCHEMY_BINDS['archive']). Each
+# chunk is copied into the archive, then deleted from the live tables in its own
+# short transaction, so the write lock is never held for long. Copies use
+# INSERT ... ON CONFLICT DO NOTHING, so a pass interrupted between the two steps
+# is simply repeated. Freed pages are returned with incremental VACUUM.
+app.config.setdefault('ARCHIVE_INTERVAL_SECONDS', 24 * 3600)
+app.config.setdefault('ARCHIVE_CHUNK_SIZE', 500)
+app.config.setdefault('ARCHIVE_MESSAGES_AFTER_DAYS', 14)
+app.config.setdefault('ARCHIVE_NOTIFICATIONS_AFTER_DAYS', 30)
+# Pages released per incremental_vacuum step; writers can get in between steps
+app.config.setdefault('ARCHIVE_VACUUM_PAGES', 2000)
+
+ARCHIVABLE_JOB_STATUSES = ('completed', 'expired')
+
+def cold_message_ids(now, limit, partition):
+    """A partition's messages of deleted jobs, and of jobs completed/expired before the cutoff"""
+    cutoff = now - timedelta(days=app.config['ARCHIVE_MESSAGES_AFTER_DAYS'])
+    return [row.id for row in (
+        db.session.query(Message.id)
+        .outerjoin(Job, Job.id == Message.job_id)
+        .outerjoin(WorkHistoryEntry, WorkHistoryEntry.job_id == Message.job_id)
+        .filter(Message.partition_id == partition, db.or_(
+            Job.id == None,
+            db.and_(Job.status == 'completed', db.or_(WorkHistoryEntry.completed_at < cutoff, WorkHistoryEntry.id == None)),
+            db.and_(Job.status == 'expired', Job.created_at < cutoff)))
+        .order_by(db.text('message.rowid')).limit(limit))]
+
+def cold_notification_ids(now, limit, partition):
+    """A partition's read notifications older than the cutoff, and any notification about a deleted job"""
+    cutoff = now - timedelta(days=app.config['ARCHIVE_NOTIFICATIONS_AFTER_DAYS'])
+    return [row.id for row in (
+        db.session.query(Notification.id)
+        .outerjoin(Job, Job.id == Notification.related_id)
+        .filter(Notification.partition_id == partition, db.or_(
+            db.and_(Notification.read == True, Notification.created_at < cutoff),
+            db.and_(Notification.related_id != None, Job.id == None)))
+        .order_by(db.text('notification.rowid')).limit(limit))]
+
+def archive_chunk(model, archive_model, ids, now):
+    """Copy rows into the archive database, then delete them from the live table"""
+    columns = [model.__table__.c[c.name] for c in archive_model.__table__.columns if c.name in model.__table__.c]
+    rows = [dict(row, archived_at=now) for row in
+            db.session.execute(db.select(*columns).where(model.id.in_(ids))
+                               .order_by(db.text(f'{model.__tablename__}.rowid'))).mappings()]
+    if rows:
+        with db.engines['archive'].begin() as conn:
+            conn.execute(sqlite_insert(archive_model.__table__).on_conflict_do_nothing(), rows)
+    model.query.filter(model.id.in_(ids)).delete(synchronize_session=False)
+    # Archived rows are still readable, so sync clients should keep them
+    SyncTombstone.query.filter(SyncTombstone.entity == model.__tablename__,
+                               SyncTombstone.entity_id.in_(ids)).delete(synchronize_session=False)
+    db.session.commit()
+    return len(rows)
+
+def archive_cold_rows(find_ids, model, archive_model, now, chunk_size):
+    moved = 0
+    for partition in partition_keys(model):
+        while True:
+            ids = find_ids(now, chunk_size, partition)
+            if not ids:
+                break
+            moved += archive_chunk(model, archive_model, ids, now)
+            if len(ids) < chunk_size:
+                break
+    return moved
+
+def delete_orphans():
+    """Remove applications left behind by deleted jobs, and feed rows of jobs no longer open"""
+    live_jobs = db.select(Job.id)
+    removed = JobApplication.query.filter(JobApplication.job_id.notin_(live_jobs)).delete(synchronize_session=False)
+    feed_jobs = db.select(Job.id).where(Job.status.in_(FEED_JOB_STATUSES))
+    removed += UserJobFeed.query.filter(UserJobFeed.job_id.notin_(feed_jobs)).delete(synchronize_session=False)
+    db.session.commit()
+    return removed
+
+def enable_incremental_vacuum(bind_key=None):
+    """
+    Switch a database to auto_vacuum=INCREMENTAL. An existing file only picks
+    the mode up after one full VACUUM, which locks the database while it runs,
+    so this is done once from the CLI rather than by the background archiver.
+    """
+    engine = db.engines[bind_key]
+    with engine.connect() as conn:
+        if conn.exec_driver_sql('PRAGMA auto_vacuum').scalar() == 2:
+            return False
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        conn.exec_driver_sql('PRAGMA auto_vacuum = INCREMENTAL')
+        conn.exec_driver_sql('VACUUM')
+    return True
+
+def incremental_vacuum(bind_key=None, pause=0.05):
+    """Release free pages in small steps. Returns the number of pages freed"""
+    engine = db.engines[bind_key]
+    step = app.config['ARCHIVE_VACUUM_PAGES']
+    freed = 0
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        if conn.exec_driver_sql('PRAGMA auto_vacuum').scalar() != 2:
+            return 0  # Not enabled; see enable_incremental_vacuum
+        while True:
+            free_pages = conn.exec_driver_sql('PRAGMA freelist_count').scalar()
+            if not free_pages:
+                break
+            conn.exec_driver_sql(f'PRAGMA incremental_vacuum({step})').fetchall()
+            freed += min(free_pages, step)
+            time.sleep(pause)
+    return freed
+
+def archive_cold_data():
+    """One archiver pass. Returns counts of what was moved, removed and freed"""
+    now = datetime.now()
+    chunk_size = app.config['ARCHIVE_CHUNK_SIZE']
+    return {
+        'messages': archive_cold_rows(cold_message_ids, Message, ArchivedMessage, now, chunk_size),
+        'notifications': archive_cold_rows(cold_notification_ids, Notification, ArchivedNotification, now, chunk_size),
+        'orphans': delete_orphans(),
+        'tombstones': prune_sync_tombstones(now),
+        'freedPages': incremental_vacuum(),
+    }
+
+def archiver_job():
+    stats = archive_cold_data()
+    if any(stats.values()):
+        return str(stats)
+
+# Backups
+# Snapshots are taken with SQLite's online backup API a few hundred pages at a
+# time. The source is only read-locked while a step runs, so writers get in
+# between steps instead of waiting for the whole copy. Each database file is
+# gzip-compressed into BACKUP_DIR with its SHA-256 recorded in a manifest,
+# which is written last: a snapshot without a manifest is incomplete. Restores
+# check the checksum and PRAGMA integrity_check before touching the live file.
+app.config.setdefault('BACKUP_DIR', os.path.join(app.instance_path, 'backups'))
+app.config.setdefault('BACKUP_INTERVAL_SECONDS', 6 * 3600)
+app.config.setdefault('BACKUP_RETAIN', 14) # Newest snapshots kept
+app.config.setdefault('BACKUP_PAGES_PER_STEP', 500)
+app.config.setdefault('BACKUP_STEP_PAUSE', 0.01) # Seconds between steps, for writers
+app.config.setdefault('BACKUP_MAX_RESTARTS', 3) # Restarts tolerated before taking bigger steps
+app.config.setdefault('BACKUP_COMPRESS_LEVEL', 6)
+
+BACKUP_CHUNK_BYTES = 1024 * 1024
+# Files of a snapshot without a manifest may belong to one still being written
+# (possibly by another process), so they are only removed once this old
+BACKUP_ORPHAN_SECONDS = 24 * 3600
+_backup_lock = threading.Lock()
+
+def backup_sources():
+    """(name, database file) of the main database and every bind"""
+    return [(bind_key or 'main', engine.url.database) for bind_key, engine in db.engines.items()]
+
+class BackupRestarted(Exception):
+    pass
+
+def copy_database(source_path, target_path, pages=-1, pause=0):
+    """
+    Online copy with the backup API, pausing between steps of `pages` pages.
+    A write to the source between steps restarts the copy from page one; if
+    that keeps happening the step size grows, down to a single step (which
+    holds the read lock for the whole copy) on the last attempt.
+    """
+    max_restarts = app.config['BACKUP_MAX_RESTARTS']
+    while True:
+        progress = {'remaining': None, 'restarts': 0}
+        def on_step(status, remaining, total):
+            if progress['remaining'] is not None and remaining >= progress['remaining']:
+                progress['restarts'] += 1
+                if progress['restarts'] > max_restarts:
+                    raise BackupRestarted()
+            progress['remaining'] = remaining
+            time.sleep(pause)
+        with closing(sqlite3.connect(source_path)) as source, closing(sqlite3.connect(target_path)) as target:
+            try:
+                source.backup(target, pages=pages, progress=on_step)
+            except BackupRestarted:
+                pages = -1 if pages * 8 >= progress['remaining'] + pages else pages * 8
+                continue
+            return target.execute('PRAGMA page_count').fetchone()[0]
+
+def list_snapshots():
+    """Manifests of complete snapshots, newest first"""
+    directory = app.config['BACKUP_DIR']
+    if not os.path.isdir(directory):
+        return []
+    manifests = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        if name.endswith('.json'):
+            with open(os.path.join(directory, name)) as f:
+                manifests.append(json.load(f))
+    return manifests
+
+def load_snapshot(name):
+    path = os.path.join(app.config['BACKUP_DIR'], f"{name}.json")
+    if os.path.basename(name) != name or not os.path.exists(path):
+        raise ValueError(f"Unknown snapshot '{name}'")
+    with open(path) as f:
+        return json.load(f)
+
+def create_snapshot():
+    """Back up every database into a new snapshot. Returns its manifest"""
+    directory = app.config['BACKUP_DIR']
+    os.makedirs(directory, exist_ok=True)
+    with _backup_lock:
+        now = datetime.now()
+        name = f"snapshot-{now.strftime('%Y%m%d-%H%M%S')}"
+        if os.path.exists(os.path.join(directory, f"{name}.json")):
+            raise ValueError(f"Snapshot '{name}' already exists")
+        manifest = {'name': name, 'createdAt': now.isoformat(), 'databases': []}
+        for source_name, source_path in backup_sources():
+            raw_path = os.path.join(directory, f"{name}.{source_name}.db.partial")
+            file_name = f"{name}.{source_name}.db.gz"
+            try:
+                pages = copy_database(source_path, raw_path, app.config['BACKUP_PAGES_PER_STEP'],
+                                      app.config['BACKUP_STEP_PAUSE'])
+                digest = hashlib.sha256()
+                with open(raw_path, 'rb') as src, gzip.open(os.path.join(directory, file_name), 'wb',
+                                                            compresslevel=app.config['BACKUP_COMPRESS_LEVEL']) as dst:
+                    for chunk in iter(lambda: src.read(BACKUP_CHUNK_BYTES), b''):
+                        digest.update(chunk)
+                        dst.write(chunk)
+                size = os.path.getsize(raw_path)
+            finally:
+                if os.path.exists(raw_path):
+                    os.remove(raw_path)
+            manifest['databases'].append({
+                'name': source_name, 'file': file_name, 'sha256': digest.hexdigest(), 'pages': pages,
+                'size': size, 'compressedSize': os.path.getsize(os.path.join(directory, file_name)),
+            })
+        partial = os.path.join(directory, f"{name}.json.partial")
+        with open(partial, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(partial, os.path.join(directory, f"{name}.json"))
+    return manifest
+
+def prune_snapshots():
+    """Delete snapshots beyond BACKUP_RETAIN, and leftovers of interrupted ones"""
+    directory = app.config['BACKUP_DIR']
+    if not os.path.isdir(directory):
+        return 0
+    with _backup_lock:
+        snapshots = list_snapshots()
+        names = {m['name'] for m in snapshots}
+        kept = {m['name'] for m in snapshots[:app.config['BACKUP_RETAIN']]}
+        removed = 0
+        for file_name in os.listdir(directory):
+            path = os.path.join(directory, file_name)
+            snapshot = file_name.split('.', 1)[0]
+            if not snapshot.startswith('snapshot-') or snapshot in kept:
+                continue
+            if snapshot not in names and time.time() - os.path.getmtime(path) < BACKUP_ORPHAN_SECONDS:
+                continue
+            os.remove(path)
+            removed += file_name == f"{snapshot}.json"
+    return removed
+
+def extract_snapshot_file(manifest, entry, target_path):
+    """Decompress one database of a snapshot and check it. Raises ValueError if damaged"""
+    path = os.path.join(app.config['BACKUP_DIR'], entry['file'])
+    if not os.path.exists(path):
+        raise ValueError(f"{manifest['name']}: {entry['file']} is missing")
+    digest = hashlib.sha256()
+    try:
+        with gzip.open(path, 'rb') as src, open(target_path, 'wb') as dst:
+            for chunk in iter(lambda: src.read(BACKUP_CHUNK_BYTES), b''):
+                digest.update(chunk)
+                dst.write(chunk)
+    except (OSError, EOFError, zlib.error) as e:
+        raise ValueError(f"{manifest['name']}: {entry['file']} is corrupt ({e})")
+    if digest.hexdigest() != entry['sha256']:
+        raise ValueError(f"{manifest['name']}: checksum mismatch for {entry['file']}")
+    with closing(sqlite3.connect(target_path)) as conn:
+        result = conn.execute('PRAGMA integrity_check').fetchone()[0]
+    if result != 'ok':
+        raise ValueError(f"{manifest['name']}: integrity check failed for {entry['file']} ({result})")
+
+def verify_snapshot(name):
+    """Check every database of a snapshot without restoring it"""
+    manifest = load_snapshot(name)
+    for entry in manifest['databases']:
+        scratch = os.path.join(app.config['BACKUP_DIR'], f"{entry['file']}.verify.partial")
+        try:
+            extract_snapshot_file(manifest, entry, scratch)
+        finally:
+            if os.path.exists(scratch):
+                os.remove(scratch)
+    return manifest
+
+def restore_snapshot(name):
+    """
+    Replace the live databases with a snapshot. Every file is verified before
+    any database is written, and each is copied back with the backup API, so
+    connections already open see the restored data. In-memory indexes (job
+    ranker, duplicate index) are rebuilt on the next start, so restart the
+    server afterwards.
+    """
+    manifest = load_snapshot(name)
+    targets = dict(backup_sources())
+    unknown = [entry['name'] for entry in manifest['databases'] if entry['name'] not in targets]
+    if unknown:
+        raise ValueError(f"{name}: no database configured for {', '.join(unknown)}")
+    scratch = {entry['name']: os.path.join(app.config['BACKUP_DIR'], f"{entry['file']}.restore.partial")
+               for entry in manifest['databases']}
+    try:
+        for entry in manifest['databases']:
+            extract_snapshot_file(manifest, entry, scratch[entry['name']])
+        db.session.remove()
+        for entry in manifest['databases']:
+            copy_database(scratch[entry['name']], targets[entry['name']])
+    finally:
+        for path in scratch.values():
+            if os.path.exists(path):
+                os.remove(path)
+    return manifest
+
+def backup_job():
+    manifest = create_snapshot()
+    pruned = prune_snapshots()
+    size = sum(d['compressedSize'] for d in manifest['databases'])
+    return f"{manifest['name']} ({size} bytes), pruned {pruned}"
+
+# Background Jobs
+# Each periodic job runs in its own thread: sleep for its configured interval,
+# run once in an app context, log what it did, repeat. A failed run is logged
+# and rolled back, and the next run happens on schedule.
+# (name, interval config key, job returning a log line or None)
+PERIODIC_JOBS = [
+    ('Sweeper', 'SWEEP_INTERVAL_SECONDS', sweeper_job),
+    ('Archiver', 'ARCHIVE_INTERVAL_SECONDS', archiver_job),
+    ('Settlement', 'SETTLEMENT_INTERVAL_SECONDS', settlement_job),
+    ('Backup', 'BACKUP_INTERVAL_SECONDS', backup_job),
+]
+
+def run_periodically(name, interval_key, job):
+    """Run job() every app.config[interval_key] seconds (the interval is re-read each time)"""
+    while True:
+        time.sleep(app.config[interval_key])
+        with app.app_context():
+            try:
+                message = job()
+                if message:
+                    print(f"{name}: {message}")
+            except Exception as e:
+                print(f"Error in {name.lower()}: {e}")
+                db.session.rollback()
+
+def start_background_jobs(use_reloader=False):
+    """Start the in-process schedulers (only in the serving process, not the reloader's parent)"""
+    if use_reloader and os.environ.get('WERKZEUG_RUN_MAIN') != 'true':
+        return
+    threading.Thread(target=warm_dedup_index, daemon=True, name='dedup-index').start()
+    for name, interval_key, job in PERIODIC_JOBS:
+        threading.Thread(target=run_periodically, args=(name, interval_key, job),
+                         daemon=True, name=name.lower()).start()
+
+# Data Export
+# Partner exports stream rows straight from a cursor (yield_per) into CSV or
+# NDJSON chunks, optionally gzip-compressed on the fly, so memory use does not
+# grow with the size of the export.
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+def export_columns(dataset):
+    """(header, column) pairs for each exportable dataset"""
+    if dataset == 'jobs':
+        return [
+            ('id', Job.id), ('title', Job.title), ('category', Job.category),
+            ('location', Job.location), ('region', Job.region_id),
+            ('minAmount', Job.min_amount), ('maxAmount', Job.max_amount),
+            ('urgency', Job.urgency), ('deliveryType', Job.deliveryType),
+            ('paymentMode', Job.paymentMode), ('status', Job.status),
+            ('postedAt', Job.postedAt), ('creatorId', Job.creator_id), ('workerId', Job.worker_id),
+        ]
+    if dataset == 'applications':
+        return [
+            ('id', JobApplication.id), ('jobId', JobApplication.job_id),
+            ('workerId', JobApplication.worker_id), ('status', JobApplication.status),
+            ('timestamp', JobApplication.timestamp), ('category', Job.category),
+            ('location', Job.location), ('region', Job.region_id),
+        ]
+    if dataset == 'completions':
+        return [
+            ('id', WorkHistoryEntry.id), ('jobId', WorkHistoryEntry.job_id),
+            ('workerId', WorkHistoryEntry.user_id), ('category', WorkHistoryEntry.category),
+            ('amount', WorkHistoryEntry.amount), ('rating', WorkHistoryEntry.rating),
+            ('completedAt', WorkHistoryEntry.completed_at),
+            ('location', Job.location), ('region', Job.region_id),
+        ]
+    raise ValueError(f"Unknown dataset '{dataset}'")
+
+def export_query(dataset, city=None, category=None):
+    """SELECT for a dataset, filtered by city (gazetteer region) and category"""
+    columns = export_columns(dataset)
+    query = db.select(*[column for _, column in columns])
+    if dataset == 'applications':
+        query = query.join(Job, Job.id == JobApplication.job_id)
+    elif dataset == 'completions':
+        # Completions outlive deleted jobs, so keep them without a location
+        query = query.outerjoin(Job, Job.id == WorkHistoryEntry.job_id)
+    
+    if city:
+        region_id = gazetteer.resolve(city)
+        if region_id is None:
+            raise ValueError(f"Unknown city '{city}'")
+        query = query.where(Job.region_id.in_(gazetteer.within(region_id)))
+    if category:
+        category_column = WorkHistoryEntry.category if dataset == 'completions' else Job.category
+        query = query.where(category_column == category)
+    return [header for header, _ in columns], query
+
+def export_value(header, value):
+    if header == 'region':
+        return gazetteer.name(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def iter_export(dataset, fmt='csv', city=None, category=None, compress=False, batch_size=1000):
+    """
+    Yield an export as byte chunks.
+    fmt is 'csv' or 'ndjson'; compress gzips the stream as it is produced.
+    Must run inside an app context.
+    """
+    if fmt not in ('csv', 'ndjson'):
+        raise ValueError(f"Unknown format '{fmt}'")
+    headers, query = export_query(dataset, city, category)
+    compressor = zlib.compressobj(wbits=31) if compress else None  # wbits=31 -> gzip container
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    
+    def flush():
+        data = buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+        return compressor.compress(data) if compressor else data
+    
+    if fmt == 'csv':
+        writer.writerow(headers)
+    
+    rows = db.session.execute(query.execution_options(stream_results=True, yield_per=batch_size))
+    for row in rows:
+        values = [export_value(h, v) for h, v in zip(headers, row)]
+        if fmt == 'csv':
+            writer.writerow(values)
+        else:
+            buffer.write(json.dumps(dict(zip(headers, values)), ensure_ascii=False) + '\n')
+        if buffer.tell() >= EXPORT_CHUNK_BYTES:
+            chunk = flush()
+            if chunk:
+                yield chunk
+    
+    chunk = flush()
+    if compressor:
+        chunk += compressor.flush()
+    if chunk:
+        yield chunk
+
+@app.route('/api/admin/export/<dataset>', methods=['GET'])
+def export_data(dataset):
+    """
+    Stream a dataset (jobs, applications, completions) for partner NGOs
+    Query params: format=csv|ndjson, city, category, gzip=1
+    Requires the X-Admin-Token header to match SHAKTHI_ADMIN_TOKEN
+    """
+    token = app.config.get('ADMIN_TOKEN')
+    if not token:
+        return jsonify({'success': False, 'message': 'Admin exports are disabled'}), 403
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), token):
+        return jsonify({'success': False, 'message': 'Invalid admin token'}), 403
+    
+    fmt = request.args.get('format', 'csv')
+    compress = request.args.get('gzip') in ('1', 'true')
+    try:
+        # Validate up front so bad parameters get a 400 instead of a broken stream
+        export_query(dataset, request.args.get('city'), request.args.get('category'))
+        if fmt not in ('csv', 'ndjson'):
+            raise ValueError(f"Unknown format '{fmt}'")
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    filename = f"{dataset}.{fmt}" + ('.gz' if compress else '')
+    mimetype = 'application/gzip' if compress else ('text/csv' if fmt == 'csv' else 'application/x-ndjson')
+    stream = iter_export(dataset, fmt, request.args.get('city'), request.args.get('category'), compress)
+    return Response(stream_with_context(stream), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
 if __name__ == '__main__':
     if not os.path.exists('instance'):
         os.makedirs('instance')
     init_db()
+    start_background_jobs(use_reloader=True)
     app.run(debug=True, port=5000)
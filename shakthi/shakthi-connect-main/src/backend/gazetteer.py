@@ -0,0 +1,159 @@
+"""
+Location gazetteer.
+Canonical regions with English spellings, old names and native-script names
+(Hindi, Telugu, Tamil, Kannada, ...). Free-text addresses and job locations
+are resolved to a region ID on write, so location filters compare integers.
+"""
+import functools
+import re
+
+ONLINE_REGION_ID = 0
+
+# (id, name, kind, parent_id, aliases)
+REGIONS = [
+    (ONLINE_REGION_ID, 'Online', 'online', None, ['remote', 'work from home', 'ऑनलाइन', 'ఆన్‌లైన్', 'ஆன்லைன்', 'ಆನ್‌ಲೈನ್']),
+
+    # States / union territories
+    (1, 'Telangana', 'state', None, ['तेलंगाना', 'తెలంగాణ', 'தெலங்கானா', 'ತೆಲಂಗಾಣ']),
+    (2, 'Andhra Pradesh', 'state', None, ['आंध्र प्रदेश', 'ఆంధ్ర ప్రదేశ్', 'ஆந்திரப் பிரதேசம்', 'ಆಂಧ್ರ ಪ್ರದೇಶ']),
+    (3, 'Tamil Nadu', 'state', None, ['tamilnadu', 'तमिलनाडु', 'తమిళనాడు', 'தமிழ்நாடு', 'ತಮಿಳುನಾಡು']),
+    (4, 'Karnataka', 'state', None, ['कर्नाटक', 'కర్ణాటక', 'கர்நாடகா', 'ಕರ್ನಾಟಕ']),
+    (5, 'Kerala', 'state', None, ['केरल', 'కేరళ', 'கேரளா', 'ಕೇರಳ', 'കേരളം']),
+    (6, 'Maharashtra', 'state', None, ['महाराष्ट्र', 'మహారాష్ట్ర', 'மகாராஷ்டிரா', 'ಮಹಾರಾಷ್ಟ್ರ']),
+    (7, 'Delhi', 'state', None, ['nct of delhi', 'दिल्ली', 'ఢిల్లీ', 'டெல்லி', 'ದೆಹಲಿ']),
+    (8, 'West Bengal', 'state', None, ['पश्चिम बंगाल', 'পশ্চিমবঙ্গ']),
+    (9, 'Gujarat', 'state', None, ['गुजरात', 'ગુજરાત']),
+    (10, 'Uttar Pradesh', 'state', None, ['उत्तर प्रदेश']),
+    (11, 'Rajasthan', 'state', None, ['राजस्थान']),
+    (12, 'Haryana', 'state', None, ['हरियाणा']),
+
+    # Districts
+    (101, 'Hyderabad District', 'district', 1, []),
+    (102, 'Ranga Reddy', 'district', 1, ['rangareddy', 'रंगारेड्डी', 'రంగారెడ్డి']),
+    (103, 'Medchal-Malkajgiri', 'district', 1, ['medchal', 'malkajgiri', 'మేడ్చల్']),
+    (104, 'Bengaluru Urban', 'district', 4, ['bangalore urban', 'ಬೆಂಗಳೂರು ನಗರ']),
+    (105, 'Mumbai Suburban', 'district', 6, []),
+
+    # Cities
+    (1001, 'Hyderabad', 'city', 101, ['hyd', 'हैदराबाद', 'హైదరాబాద్', 'ஹைதராபாத்', 'ಹೈದರಾಬಾದ್']),
+    (1002, 'Secunderabad', 'city', 101, ['सिकंदराबाद', 'సికింద్రాబాద్']),
+    (1003, 'Warangal', 'city', 1, ['वारंगल', 'వరంగల్']),
+    (1004, 'Visakhapatnam', 'city', 2, ['vizag', 'vishakhapatnam', 'विशाखापत्तनम', 'విశాఖపట్నం']),
+    (1005, 'Vijayawada', 'city', 2, ['विजयवाड़ा', 'విజయవాడ']),
+    (1006, 'Chennai', 'city', 3, ['madras', 'चेन्नई', 'చెన్నై', 'சென்னை', 'ಚೆನ್ನೈ']),
+    (1007, 'Coimbatore', 'city', 3, ['kovai', 'कोयंबटूर', 'கோயம்புத்தூர்']),
+    (1008, 'Madurai', 'city', 3, ['मदुरै', 'மதுரை']),
+    (1009, 'Bengaluru', 'city', 104, ['bangalore', 'bengalooru', 'बेंगलुरु', 'बैंगलोर', 'బెంగళూరు', 'பெங்களூரு', 'ಬೆಂಗಳೂರು']),
+    (1010, 'Mysuru', 'city', 4, ['mysore', 'मैसूर', 'మైసూరు', 'மைசூர்', 'ಮೈಸೂರು']),
+    (1011, 'Kochi', 'city', 5, ['cochin', 'ernakulam', 'कोच्चि', 'കൊച്ചി']),
+    (1012, 'Thiruvananthapuram', 'city', 5, ['trivandrum', 'तिरुवनंतपुरम', 'തിരുവനന്തപുരം']),
+    (1013, 'Mumbai', 'city', 6, ['bombay', 'मुंबई', 'ముంబై', 'மும்பை', 'ಮುಂಬೈ']),
+    (1014, 'Pune', 'city', 6, ['poona', 'पुणे']),
+    (1015, 'New Delhi', 'city', 7, ['नई दिल्ली', 'న్యూ ఢిల్లీ']),
+    (1016, 'Kolkata', 'city', 8, ['calcutta', 'कोलकाता', 'কলকাতা']),
+    (1017, 'Ahmedabad', 'city', 9, ['अहमदाबाद', 'અમદાવાદ']),
+    (1018, 'Lucknow', 'city', 10, ['लखनऊ']),
+    (1019, 'Jaipur', 'city', 11, ['जयपुर']),
+    (1020, 'Gurugram', 'city', 12, ['gurgaon', 'गुरुग्राम', 'गुड़गांव']),
+]
+
+# Most specific region wins when an address mentions several ("Hyderabad, Telangana")
+REGION_KIND_RANK = {'online': 0, 'state': 1, 'district': 2, 'city': 3}
+
+class Gazetteer:
+    """Hash-based resolver from free-text place names to canonical region IDs"""
+
+    MAX_ALIAS_WORDS = 4
+
+    def __init__(self, regions):
+        self.regions = {}   # id -> (name, kind, parent_id)
+        self.aliases = {}   # normalized alias -> id
+        for region_id, name, kind, parent_id, aliases in regions:
+            self.regions[region_id] = (name, kind, parent_id)
+            for alias in [name] + aliases:
+                key = self.normalize(alias)
+                current = self.aliases.get(key)
+                # On a clash keep the more specific region (city over district)
+                if current is None or REGION_KIND_RANK[kind] > REGION_KIND_RANK[self.regions[current][1]]:
+                    self.aliases[key] = region_id
+        self._family = {}
+        self.resolve = functools.lru_cache(maxsize=8192)(self.resolve)
+
+    @staticmethod
+    def normalize(text):
+        """Lowercase, drop zero-width joiners and collapse separators to single spaces"""
+        text = text.lower().replace('\u200c', '').replace('\u200d', '')
+        return ' '.join(re.split(r'[\s,;:/|()\[\].\-]+', text)).strip()
+
+    def resolve(self, text):
+        """Canonical region ID mentioned in text, or None if no known place is found"""
+        if not text:
+            return None
+        words = self.normalize(text).split()
+        best = None
+        for size in range(min(self.MAX_ALIAS_WORDS, len(words)), 0, -1):
+            for start in range(len(words) - size + 1):
+                region_id = self.aliases.get(' '.join(words[start:start + size]))
+                if region_id is None:
+                    continue
+                if best is None or REGION_KIND_RANK[self.regions[region_id][1]] > REGION_KIND_RANK[self.regions[best][1]]:
+                    best = region_id
+        return best
+
+    def name(self, region_id):
+        return self.regions[region_id][0] if region_id in self.regions else None
+
+    def ancestors(self, region_id):
+        """Parent chain of a region, nearest first"""
+        chain = []
+        parent = self.regions.get(region_id, (None, None, None))[2]
+        while parent is not None:
+            chain.append(parent)
+            parent = self.regions[parent][2]
+        return chain
+
+    def district(self, region_id):
+        """The district a region lies in (itself if it is a district), or None"""
+        for candidate in [region_id] + self.ancestors(region_id):
+            if self.regions[candidate][1] == 'district':
+                return candidate
+        return None
+
+    def state(self, region_id):
+        """The state a region lies in (itself if it is a state), or None"""
+        for candidate in [region_id] + self.ancestors(region_id):
+            if self.regions[candidate][1] == 'state':
+                return candidate
+        return None
+
+    def family(self, region_id):
+        """The region with all its ancestors and descendants (regions that overlap it)"""
+        if region_id not in self._family:
+            related = {region_id, *self.ancestors(region_id)}
+            related.update(r for r in self.regions if region_id in self.ancestors(r))
+            # Neighbouring cities of the same district count as nearby
+            district = self.district(region_id)
+            if district is not None:
+                related.update(r for r in self.regions if district in self.ancestors(r))
+            self._family[region_id] = frozenset(related)
+        return self._family[region_id]
+
+    def within(self, region_id):
+        """The region and every region inside it"""
+        return frozenset([region_id] + [r for r in self.regions if region_id in self.ancestors(r)])
+
+    def affinity(self, user_region_id, job_region_id):
+        """
+        How well a job's region fits a user's region:
+        1.0 same region, 0.5 overlapping (city within state), in the same district
+        or online, 0.0 otherwise
+        """
+        if job_region_id == ONLINE_REGION_ID:
+            return 0.5
+        if user_region_id == job_region_id:
+            return 1.0
+        if job_region_id in self.family(user_region_id):
+            return 0.5
+        if self.district(user_region_id) is not None and self.district(user_region_id) == self.district(job_region_id):
+            return 0.5
+        return 0.0
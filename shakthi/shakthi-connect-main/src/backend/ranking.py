@@ -0,0 +1,221 @@
+"""
+Job ranking.
+Features of every open job live in NumPy arrays (one row per job), kept in
+sync as jobs are posted, locked or deleted. Ranking a user's candidates is a
+single vectorized pass over those rows instead of a Python loop per job.
+"""
+import threading
+from datetime import datetime
+
+import numpy as np
+
+URGENCY_SCORES = {'today': 1.0, 'tomorrow': 0.75, 'this_week': 0.5, 'flexible': 0.25}
+RECENCY_HALF_LIFE_HOURS = 48
+
+# Relative weight of each feature in the final rank score (0-100)
+DEFAULT_RANKING_WEIGHTS = {
+    'skill': 0.5,
+    'budget': 0.15,
+    'urgency': 0.1,
+    'rating': 0.1,
+    'recency': 0.1,
+    'location': 0.05,
+}
+
+def parse_posted_at(posted_at):
+    """Convert Job.postedAt to epoch seconds (now if missing or unparseable)"""
+    try:
+        return datetime.strptime(posted_at, "%Y-%m-%d %I:%M %p").timestamp()
+    except (TypeError, ValueError):
+        return datetime.now().timestamp()
+
+class JobRanker:
+    """
+    In-memory feature store and vectorized scorer for open jobs.
+    The matching rules are passed in: parse_skills(skills_str) -> list of skills,
+    skill_match(skills, category) -> 0-100, location_score(address, location) -> 0-1.
+    """
+
+    def __init__(self, parse_skills, skill_match, location_score, capacity=1024):
+        self.parse_skills = parse_skills
+        self.skill_match = skill_match
+        self.location_score = location_score
+        self._lock = threading.Lock()
+        self.loaded = False
+        self.size = 0
+        self.row_of = {}  # job_id -> row
+        self.categories, self._category_index = [], {}
+        self.locations, self._location_index = [], {}
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        self.job_ids = np.empty(capacity, dtype=object)
+        self.creator_ids = np.empty(capacity, dtype=object)
+        self.category_idx = np.zeros(capacity, dtype=np.int32)
+        self.location_idx = np.zeros(capacity, dtype=np.int32)
+        self.budget = np.zeros(capacity)
+        self.urgency = np.zeros(capacity)
+        self.rating = np.zeros(capacity)
+        self.posted = np.zeros(capacity)
+
+    def _grow(self):
+        old = {name: getattr(self, name) for name in
+               ('job_ids', 'creator_ids', 'category_idx', 'location_idx', 'budget', 'urgency', 'rating', 'posted')}
+        self._allocate(len(self.job_ids) * 2)
+        for name, values in old.items():
+            getattr(self, name)[:self.size] = values[:self.size]
+
+    @staticmethod
+    def _intern(values, index, value):
+        value = value or ''
+        if value not in index:
+            index[value] = len(values)
+            values.append(value)
+        return index[value]
+
+    def _write_row(self, row, job):
+        self.job_ids[row] = job.id
+        self.creator_ids[row] = job.creator_id
+        self.category_idx[row] = self._intern(self.categories, self._category_index, job.category)
+        self.location_idx[row] = self._intern(self.locations, self._location_index, job.location)
+        self.budget[row] = job.max_amount or 0
+        self.urgency[row] = URGENCY_SCORES.get(job.urgency, URGENCY_SCORES['flexible'])
+        self.rating[row] = job.customerRating or 0.0
+        self.posted[row] = parse_posted_at(job.postedAt)
+
+    def load(self, jobs):
+        """Replace the feature store with the given jobs"""
+        with self._lock:
+            self.size = 0
+            self.row_of = {}
+            for job in jobs:
+                self._upsert(job)
+            self.loaded = True
+
+    def ensure_loaded(self, open_jobs):
+        """Load the jobs returned by open_jobs() on first use"""
+        if not self.loaded:
+            self.load(open_jobs())
+
+    def _upsert(self, job):
+        row = self.row_of.get(job.id)
+        if row is None:
+            if self.size == len(self.job_ids):
+                self._grow()
+            row = self.size
+            self.size += 1
+            self.row_of[job.id] = row
+        self._write_row(row, job)
+
+    def upsert(self, job):
+        """Add or refresh a job's features (ignored until the store is loaded)"""
+        with self._lock:
+            if self.loaded:
+                self._upsert(job)
+
+    def remove(self, job_id):
+        """Drop a job that is no longer open, moving the last row into its slot"""
+        with self._lock:
+            row = self.row_of.pop(job_id, None)
+            if row is None:
+                return
+            last = self.size - 1
+            if row != last:
+                for values in (self.job_ids, self.creator_ids, self.category_idx, self.location_idx,
+                               self.budget, self.urgency, self.rating, self.posted):
+                    values[row] = values[last]
+                self.row_of[self.job_ids[row]] = row
+            self.job_ids[last] = None
+            self.creator_ids[last] = None
+            self.size = last
+
+    def _user_vectors(self, user):
+        """Per-category skill scores and per-location match flags for a user"""
+        user_skills = self.parse_skills(user.skills_str)
+        category_scores = np.array([self.skill_match(user_skills, c) for c in self.categories], dtype=float)
+        location_scores = np.array([self.location_score(user.address, loc) for loc in self.locations], dtype=float)
+        return user_skills, category_scores, location_scores
+
+    def _job_features(self, rows, now):
+        """Job-only feature columns for the given rows, each scaled to 0-1"""
+        budget = np.log1p(self.budget[rows])
+        top_budget = np.log1p(self.budget[:self.size]).max() if self.size else 0.0
+        if top_budget > 0:
+            budget = budget / top_budget
+        age_hours = np.maximum(now - self.posted[rows], 0) / 3600
+        recency = 0.5 ** (age_hours / RECENCY_HALF_LIFE_HOURS)
+        return budget, self.urgency[rows], self.rating[rows] / 5.0, recency
+
+    def score(self, user, job_ids=None, weights=None):
+        """
+        Rank open jobs for one user.
+        job_ids restricts scoring to those candidates (e.g. the user's feed).
+        Returns [(job_id, rank_score, skill_score)] sorted best first.
+        """
+        weights = weights or DEFAULT_RANKING_WEIGHTS
+        with self._lock:
+            if job_ids is None:
+                rows = np.arange(self.size)
+            else:
+                rows = np.array([self.row_of[j] for j in job_ids if j in self.row_of], dtype=np.int64)
+            if rows.size == 0:
+                return []
+            
+            user_skills, category_scores, location_scores = self._user_vectors(user)
+            skill = category_scores[self.category_idx[rows]]
+            location = location_scores[self.location_idx[rows]]
+            budget, urgency, rating, recency = self._job_features(rows, datetime.now().timestamp())
+            
+            # Same eligibility rules as score_job_for_user
+            eligible = (location > 0) & (self.creator_ids[rows] != user.id)
+            if user_skills:
+                eligible &= skill >= 30
+            
+            total = (weights['skill'] * skill / 100 + weights['budget'] * budget +
+                     weights['urgency'] * urgency + weights['rating'] * rating +
+                     weights['recency'] * recency + weights['location'] * location)
+            total = total / sum(weights.values()) * 100
+            
+            rows, total, skill = rows[eligible], total[eligible], skill[eligible]
+            order = np.argsort(-total, kind='stable')
+            job_ids = self.job_ids[rows[order]]
+        return [(job_id, round(float(t), 1), int(s)) for job_id, t, s in zip(job_ids, total[order], skill[order])]
+
+    def score_many(self, users, top_k=10, weights=None, chunk_size=256):
+        """
+        Rank open jobs for many users at once (e.g. nightly digests).
+        Users are scored in chunks as a users x jobs matrix.
+        Returns {user_id: [(job_id, rank_score, skill_score)]} with at most top_k each.
+        """
+        weights = weights or DEFAULT_RANKING_WEIGHTS
+        results = {}
+        with self._lock:
+            n = self.size
+            if n == 0:
+                return {user.id: [] for user in users}
+            rows = np.arange(n)
+            budget, urgency, rating, recency = self._job_features(rows, datetime.now().timestamp())
+            job_part = (weights['budget'] * budget + weights['urgency'] * urgency +
+                        weights['rating'] * rating + weights['recency'] * recency)
+            weight_sum = sum(weights.values())
+            
+            for start in range(0, len(users), chunk_size):
+                chunk = users[start:start + chunk_size]
+                vectors = [self._user_vectors(user) for user in chunk]
+                skill = np.stack([v[1] for v in vectors])[:, self.category_idx[:n]]
+                location = np.stack([v[2] for v in vectors])[:, self.location_idx[:n]]
+                
+                eligible = (location > 0) & (self.creator_ids[:n][None, :] != np.array([u.id for u in chunk], dtype=object)[:, None])
+                has_skills = np.array([bool(v[0]) for v in vectors])
+                eligible &= (skill >= 30) | ~has_skills[:, None]
+                
+                total = (weights['skill'] * skill / 100 + weights['location'] * location + job_part) / weight_sum * 100
+                total = np.where(eligible, total, -1.0)
+                
+                k = min(top_k, n)
+                top = np.argpartition(-total, k - 1, axis=1)[:, :k]
+                for i, user in enumerate(chunk):
+                    best = top[i][np.argsort(-total[i, top[i]], kind='stable')]
+                    results[user.id] = [(self.job_ids[j], round(float(total[i, j]), 1), int(skill[i, j]))
+                                        for j in best if eligible[i, j]]
+        return results
@@ -0,0 +1,61 @@
+import argparse
+
+from backend.app import app, db, create_snapshot, prune_snapshots, list_snapshots, verify_snapshot, restore_snapshot
+
+def create():
+    manifest = create_snapshot()
+    for entry in manifest['databases']:
+        print(f"  {entry['name']}: {entry['size'] / 1e6:.1f} MB -> {entry['compressedSize'] / 1e6:.1f} MB ({entry['file']})")
+    print(f"Created {manifest['name']}.")
+    pruned = prune_snapshots()
+    if pruned:
+        print(f"Pruned {pruned} old snapshots (keeping {app.config['BACKUP_RETAIN']}).")
+    return manifest
+
+def show():
+    snapshots = list_snapshots()
+    if not snapshots:
+        print(f"No snapshots in {app.config['BACKUP_DIR']}")
+    for manifest in snapshots:
+        size = sum(entry['compressedSize'] for entry in manifest['databases'])
+        print(f"{manifest['name']}  {manifest['createdAt']}  {size / 1e6:.1f} MB")
+
+def verify(name):
+    verify_snapshot(name)
+    print(f"{name}: checksums and integrity check OK.")
+
+def restore(name, safety_snapshot=True):
+    verify_snapshot(name)
+    if safety_snapshot:
+        print("Snapshotting the current databases first...")
+        print(f"Current state saved as {create_snapshot()['name']}.")
+    restore_snapshot(name)
+    print(f"Restored {name}. Restart the server so in-memory indexes are rebuilt.")
+
+def run(args):
+    with app.app_context():
+        try:
+            if args.command == 'create':
+                create()
+            elif args.command == 'list':
+                show()
+            elif args.command == 'verify':
+                verify(args.name)
+            else:
+                restore(args.name, safety_snapshot=not args.no_safety_snapshot)
+            print("\n✅ Done!")
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Error: {e}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Online, compressed, checksummed snapshots of the databases")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('create', help="take a snapshot now (the app can keep running)")
+    commands.add_parser('list', help="list complete snapshots, newest first")
+    commands.add_parser('verify', help="check a snapshot's checksums and integrity").add_argument('name')
+    restore_parser = commands.add_parser('restore', help="verify a snapshot, then copy it over the live databases")
+    restore_parser.add_argument('name')
+    restore_parser.add_argument('--no-safety-snapshot', action='store_true',
+                                help="do not snapshot the current databases before restoring")
+    run(parser.parse_args())
@@ -0,0 +1,92 @@
+import random
+import statistics
+import time
+import uuid
+
+from backend.app import app, Job, JobDedupIndex, job_shingles
+
+NUM_JOBS = 100000
+NUM_CUSTOMERS = 20000
+NUM_QUERIES = 2000
+NUM_BRUTE_FORCE = 20
+
+WORDS = ("need help with stitching blouse saree kurta tailoring lining repair hem alteration cooking meals "
+         "lunch dinner party tiffin tuition maths science english class evening weekend tutor data entry "
+         "excel typing forms scanning design poster logo banner social media posts instagram reels elderly "
+         "care mother father hospital visit medicine daily morning urgent flexible budget near home online "
+         "cotton silk embroidery mehendi bridal makeup facial threading hair wedding festival diwali pongal "
+         "ugadi rakhi gifts handmade candles pickles papad snacks sweets laddu murukku delivery pickup").split()
+
+def random_text(n):
+    return ' '.join(random.choice(WORDS) for _ in range(n))
+
+def make_jobs(n):
+    customers = [str(uuid.uuid4()) for _ in range(NUM_CUSTOMERS)]
+    return [Job(id=str(uuid.uuid4()), title=random_text(4), description=random_text(random.randint(12, 24)),
+                creator_id=random.choice(customers), status='open') for _ in range(n)]
+
+def small_edit(text):
+    """A typical repost: one word changed, added or removed, or extra punctuation"""
+    words = text.split()
+    edit = random.choice(['swap', 'add', 'drop', 'punct'])
+    i = random.randrange(len(words))
+    if edit == 'swap':
+        words[i] = random.choice(WORDS)
+    elif edit == 'add':
+        words.insert(i, random.choice(WORDS))
+    elif edit == 'drop' and len(words) > 1:
+        del words[i]
+    else:
+        words[-1] += '!!'
+    return ' '.join(words)
+
+def jaccard(a, b):
+    a, b = set(a.tolist()), set(b.tolist())
+    return len(a & b) / len(a | b)
+
+def brute_force(jobs, title, description, creator_id, threshold):
+    """Exact shingle Jaccard against every open job of the same customer"""
+    shingles = job_shingles(title, description)
+    return [job.id for job in jobs if job.creator_id == creator_id
+            and jaccard(shingles, job_shingles(job.title, job.description)) >= threshold]
+
+def run_benchmark():
+    random.seed(7)
+    jobs = make_jobs(NUM_JOBS)
+
+    with app.app_context():
+        threshold = app.config['DUPLICATE_JOB_THRESHOLD']
+        index = JobDedupIndex()
+        start = time.perf_counter()
+        index.load(jobs)
+        print(f"Indexed {NUM_JOBS} open jobs in {time.perf_counter() - start:.1f} s")
+
+        reposts = random.sample(jobs, NUM_QUERIES)
+        fresh = make_jobs(NUM_QUERIES)
+        timings, found, false_hits = [], 0, 0
+        for original in reposts:
+            start = time.perf_counter()
+            matches = index.find_duplicates(original.title, small_edit(original.description), original.creator_id)
+            timings.append(time.perf_counter() - start)
+            found += any(job_id == original.id for job_id, _ in matches)
+        for job in fresh:
+            start = time.perf_counter()
+            false_hits += bool(index.find_duplicates(job.title, job.description, job.creator_id))
+            timings.append(time.perf_counter() - start)
+
+        timings.sort()
+        print(f"\nLSH lookup over {NUM_JOBS} jobs ({len(timings)} queries):")
+        print(f"  median: {statistics.median(timings) * 1e6:.0f} us, p99: {timings[int(len(timings) * 0.99)] * 1e6:.0f} us")
+        print(f"  reposts detected: {found}/{NUM_QUERIES}, unrelated postings flagged: {false_hits}/{NUM_QUERIES}")
+
+        start = time.perf_counter()
+        for original in reposts[:NUM_BRUTE_FORCE]:
+            brute_force(jobs, original.title, small_edit(original.description), original.creator_id, threshold)
+        brute_ms = (time.perf_counter() - start) * 1000 / NUM_BRUTE_FORCE
+        print(f"\nBrute force (exact Jaccard vs every open job): {brute_ms:.0f} ms/query")
+
+        assert statistics.median(timings) < 0.001
+        print("\nSUCCESS: Near-duplicate lookups stay under a millisecond.")
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,120 @@
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy import create_engine
+
+from backend.app import db, compact_keys, uuid_to_key
+
+NUM_USERS = 10000
+NUM_JOBS = 50000
+NUM_APPLICATIONS = 100000
+NUM_MESSAGES = 300000
+NUM_LOOKUPS = 20000
+
+JOIN_QUERY = """
+    SELECT COUNT(*) FROM message m
+    JOIN job j ON j.id = m.job_id
+    JOIN user u ON u.id = m.sender_id
+    WHERE j.status = 'open'
+"""
+
+def new_id():
+    return str(uuid.uuid4())
+
+def build_text_db(path):
+    """Schema from the app's models, filled with keys stored as 36-char text (the old format)"""
+    engine = create_engine(f'sqlite:///{path}')
+    db.metadata.create_all(engine)
+    engine.dispose()
+
+    random.seed(42)
+    users = [new_id() for _ in range(NUM_USERS)]
+    jobs = [new_id() for _ in range(NUM_JOBS)]
+    now = datetime.now().isoformat(' ')
+    con = sqlite3.connect(path)
+    con.executemany('INSERT INTO user (id, name, email) VALUES (?, ?, ?)',
+                    ((u, 'User', f'{u}@example.com') for u in users))
+    con.executemany('INSERT INTO job (id, title, status, creator_id, worker_id) VALUES (?, ?, ?, ?, ?)',
+                    ((j, 'Job', random.choice(['open', 'on_hold', 'locked', 'completed']),
+                      random.choice(users), random.choice(users)) for j in jobs))
+    con.executemany('INSERT INTO job_application (id, job_id, worker_id, status) VALUES (?, ?, ?, ?)',
+                    ((new_id(), random.choice(jobs), random.choice(users), 'pending') for _ in range(NUM_APPLICATIONS)))
+    con.executemany('INSERT INTO message (id, job_id, sender_id, content) VALUES (?, ?, ?, ?)',
+                    ((new_id(), random.choice(jobs), random.choice(users), 'Hello') for _ in range(NUM_MESSAGES)))
+    con.executemany('INSERT INTO notification (id, user_id, related_id, created_at) VALUES (?, ?, ?, ?)',
+                    ((new_id(), random.choice(users), random.choice(jobs), now) for _ in range(NUM_MESSAGES)))
+    con.commit()
+    con.close()
+    return jobs
+
+def vacuum(path):
+    con = sqlite3.connect(path)
+    con.execute('VACUUM')
+    con.close()
+
+def measure(path, lookup_keys):
+    con = sqlite3.connect(path)
+    sizes = dict(con.execute('SELECT name, SUM(pgsize) FROM dbstat GROUP BY name'))
+    indexes = {name for (name,) in con.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    # Tables without rowid keep their primary key inside the table b-tree
+    index_bytes = sum(size for name, size in sizes.items() if name in indexes)
+
+    join_times = []
+    for _ in range(5):
+        start = time.perf_counter()
+        con.execute(JOIN_QUERY).fetchone()
+        join_times.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for key in lookup_keys:
+        con.execute('SELECT title FROM job WHERE id = ?', (key,)).fetchone()
+    lookup_us = (time.perf_counter() - start) * 1e6 / len(lookup_keys)
+    con.close()
+    return {
+        'file': os.path.getsize(path),
+        'indexes': index_bytes,
+        'join_ms': statistics.median(join_times) * 1000,
+        'lookup_us': lookup_us,
+    }
+
+def run_benchmark():
+    workdir = tempfile.mkdtemp()
+    try:
+        text_path = os.path.join(workdir, 'text_keys.db')
+        blob_path = os.path.join(workdir, 'blob_keys.db')
+        print(f"Building {NUM_JOBS} jobs, {NUM_APPLICATIONS} applications, {NUM_MESSAGES} messages and notifications...")
+        jobs = build_text_db(text_path)
+        shutil.copy(text_path, blob_path)
+
+        engine = create_engine(f'sqlite:///{blob_path}')
+        start = time.perf_counter()
+        converted = compact_keys(engine, db.metadata)
+        engine.dispose()
+        print(f"Migrated {converted} rows in {time.perf_counter() - start:.1f} s")
+        vacuum(text_path)
+        vacuum(blob_path)
+
+        sample = random.sample(jobs, NUM_LOOKUPS)
+        before = measure(text_path, sample)
+        after = measure(blob_path, [uuid_to_key(j) for j in sample])
+
+        print(f"\n{'':22}{'text keys':>12}{'blob keys':>12}")
+        print(f"{'Database file (MB)':22}{before['file'] / 2**20:12.1f}{after['file'] / 2**20:12.1f}")
+        print(f"{'Indexes (MB)':22}{before['indexes'] / 2**20:12.1f}{after['indexes'] / 2**20:12.1f}")
+        print(f"{'3-way join (ms)':22}{before['join_ms']:12.1f}{after['join_ms']:12.1f}")
+        print(f"{'PK lookup (us)':22}{before['lookup_us']:12.1f}{after['lookup_us']:12.1f}")
+
+        assert after['file'] < before['file']
+        print(f"\nSUCCESS: Compact keys use {100 * (1 - after['file'] / before['file']):.0f}% less space.")
+    finally:
+        shutil.rmtree(workdir)
+
+if __name__ == "__main__":
+    run_benchmark()
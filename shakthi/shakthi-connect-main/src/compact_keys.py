@@ -0,0 +1,26 @@
+import os
+
+from backend.app import app, db, init_db
+
+def database_size(engine):
+    return os.path.getsize(engine.url.database) if os.path.exists(engine.url.database) else 0
+
+def compact():
+    with app.app_context():
+        engines = {bind_key or 'main': engine for bind_key, engine in db.engines.items()}
+        before = {name: database_size(engine) for name, engine in engines.items()}
+        try:
+            print("Converting UUID keys to 16-byte blobs...")
+            init_db()
+            print("Reclaiming space with VACUUM (the databases are locked meanwhile)...")
+            for name, engine in engines.items():
+                with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                    conn.exec_driver_sql('VACUUM')
+                print(f"{name}: {before[name] / 1024:.0f} KB -> {database_size(engine) / 1024:.0f} KB")
+            print("\n✅ Keys compacted!")
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Error compacting keys: {e}")
+
+if __name__ == "__main__":
+    compact()
@@ -0,0 +1,33 @@
+import argparse
+import sys
+
+from backend.app import app, iter_export
+
+def export_data():
+    parser = argparse.ArgumentParser(description="Stream platform data as CSV or NDJSON")
+    parser.add_argument('dataset', choices=['jobs', 'applications', 'completions'])
+    parser.add_argument('--format', choices=['csv', 'ndjson'], default='csv')
+    parser.add_argument('--city', help="Only rows in this city/district/state (any known spelling)")
+    parser.add_argument('--category', help="Only rows in this job category")
+    parser.add_argument('--gzip', action='store_true', help="Compress the output")
+    parser.add_argument('--output', '-o', help="Output file (default: stdout)")
+    args = parser.parse_args()
+
+    with app.app_context():
+        out = open(args.output, 'wb') if args.output else sys.stdout.buffer
+        try:
+            written = 0
+            for chunk in iter_export(args.dataset, args.format, args.city, args.category, args.gzip):
+                out.write(chunk)
+                written += len(chunk)
+        except ValueError as e:
+            print(f"❌ {e}", file=sys.stderr)
+            sys.exit(1)
+        finally:
+            if args.output:
+                out.close()
+        if args.output:
+            print(f"✅ Wrote {written} bytes to {args.output}", file=sys.stderr)
+
+if __name__ == "__main__":
+    export_data()
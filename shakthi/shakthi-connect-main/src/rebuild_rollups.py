@@ -0,0 +1,17 @@
+from backend.app import app, db, init_db, rebuild_work_rollups
+
+def rebuild():
+    with app.app_context():
+        try:
+            init_db()
+            print("Rebuilding work history rollups...")
+            backfilled, processed = rebuild_work_rollups()
+            print(f"Backfilled {backfilled} history entries from completed jobs.")
+            print(f"Rolled up {processed} history entries.")
+            print("\n✅ Rollups rebuilt!")
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Error rebuilding rollups: {e}")
+
+if __name__ == "__main__":
+    rebuild()
@@ -0,0 +1,74 @@
+import urllib.request
+import json
+import threading
+import uuid
+
+BASE_URL = "http://localhost:5000/api"
+NUM_WORKERS = 25
+
+def make_request(url, method='GET', data=None):
+    headers = {'Content-Type': 'application/json'}
+    if data:
+        data = json.dumps(data).encode('utf-8')
+
+    req = urllib.request.Request(url, data=data, headers=headers, method=method)
+    try:
+        with urllib.request.urlopen(req) as response:
+            return response.getcode(), json.loads(response.read().decode('utf-8'))
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read().decode('utf-8'))
+
+def run_verification():
+    # 1. Create Job
+    print("1. Creating Job...")
+    job_data = {
+        "title": "Concurrency Job",
+        "description": "Many workers apply at once",
+        "category": "Other",
+        "amount": {"min": 100, "max": 200},
+        "location": "Test Loc",
+        "customerName": "Test Customer",
+        "creatorId": "customer_1"
+    }
+    code, res_data = make_request(f"{BASE_URL}/jobs", 'POST', job_data)
+    if code not in [200, 201]:
+        print(f"Failed to create job: {res_data}")
+        return
+    job_id = res_data['job']['id']
+    print(f"Job Created: {job_id}")
+
+    # 2. Many workers apply at the same moment
+    print(f"\n2. {NUM_WORKERS} workers applying concurrently...")
+    results = []
+    barrier = threading.Barrier(NUM_WORKERS)
+
+    def apply(worker_id):
+        barrier.wait()
+        results.append(make_request(f"{BASE_URL}/jobs/{job_id}/apply", 'POST', {"workerId": worker_id}))
+
+    threads = [threading.Thread(target=apply, args=(str(uuid.uuid4()),)) for _ in range(NUM_WORKERS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    winners = [r for r in results if r[0] == 201]
+    losers = [r for r in results if r[0] == 400]
+    print(f"Accepted: {len(winners)}, Rejected: {len(losers)}, Other: {len(results) - len(winners) - len(losers)}")
+
+    # 3. Verify exactly one application exists and the job is on hold
+    print("\n3. Verifying Job Status...")
+    code, res_data = make_request(f"{BASE_URL}/my-postings", 'POST', {"userId": "customer_1"})
+    job = next((j for j in res_data if j['id'] == job_id), None)
+    print(f"Final Job Status: {job['status']}, Applications: {len(job['applications'])}")
+
+    if len(winners) == 1 and job['status'] == 'on_hold' and len(job['applications']) == 1:
+        print("\nSUCCESS: Exactly one worker won the job!")
+    else:
+        print("\nFAILURE: Concurrent applications were not serialized.")
+
+if __name__ == "__main__":
+    try:
+        run_verification()
+    except Exception as e:
+        print(f"Error: {e}")